@@ -1,40 +1,193 @@
-from litellm import completion
-from .tools import read_code, write_code, execute_test
+from litellm import stream_chunk_builder
+
+from .llm_cache import completion, acompletion, is_cache_hit
+from .tools import (
+    read_code,
+    list_symbols,
+    read_symbol,
+    grep_code,
+    write_code,
+    execute_test
+)
 from memory.rag import retrieve_memory
 from memory.learning import store_correction
 from memory.vector_store import store
 
 from .prompts import SYSTEM_PROMPT
+from .validator import INVALID_PATTERNS, HIERARCHY_ERROR, hierarchy_violations, validate
+from .telemetry import CycleTrace
+import asyncio
 import json
+import re
 
 NVIDIA_API_KEY = "xxxxxxxxxxxxxxxxxxxxxxxxxxxxx"
 NVIDIA_BASE_URL = "https://integrate.api.nvidia.com/v1"
 
-INVALID_PATTERNS = [
-    "Vport.find().DeviceGroup",
-    "Vport.DeviceGroup",
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "list_symbols",
+            "description": "List functions and methods in cafy_apis with signature and "
+                           "first docstring line. Narrow with file_path or a substring.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_path": {"type": "string"},
+                    "contains": {"type": "string"}
+                }
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "read_symbol",
+            "description": "Return the full source of one function or method, "
+                           "e.g. 'IXIA.create_bgp_router' or 'create_bgp_router'.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "file_path": {"type": "string"}
+                },
+                "required": ["name"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "grep_code",
+            "description": "Regex search over cafy_apis; each hit names its enclosing symbol.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "pattern": {"type": "string"},
+                    "max_hits": {"type": "integer"},
+                    "file_path": {"type": "string"}
+                },
+                "required": ["pattern"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "write_code",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_path": {"type": "string"},
+                    "new_code": {"type": "string"}
+                },
+                "required": ["file_path", "new_code"]
+            }
+        }
+    }
 ]
 
-def validate_generated_code(code: str):
-    for pattern in INVALID_PATTERNS:
-        if pattern in code:
-            raise ValueError(
-                f"Invalid IxNetwork object hierarchy detected: {pattern}"
+READ_TOOLS = {
+    "read_code": read_code,
+    "list_symbols": list_symbols,
+    "read_symbol": read_symbol,
+    "grep_code": grep_code,
+}
+
+def validate_generated_code(code: str, check_existing: bool = True, allow=()):
+    violations = validate(code, check_existing=check_existing, allow=allow)
+    if violations:
+        raise ValueError("\n".join(violations))
+
+class StreamValidator:
+    """
+    Incremental INVALID_PATTERNS check over streamed text. Each stream
+    (assistant content, or the arguments of one tool call) is checked only
+    around the newly arrived text, so a pattern split across chunks is
+    still caught without rescanning everything.
+    """
+    def __init__(self):
+        self.buffers = {}
+        self.overlap = max(len(p) for p in INVALID_PATTERNS) - 1
+
+    def feed(self, key, delta):
+        if not delta:
+            return None
+        buffer = self.buffers.get(key, "") + delta
+        self.buffers[key] = buffer
+        window = buffer[-(len(delta) + self.overlap):]
+        for pattern in INVALID_PATTERNS:
+            if pattern in window:
+                return pattern
+        return None
+
+    def feed_chunk(self, chunk):
+        if not chunk.choices:
+            return None
+        delta = chunk.choices[0].delta
+        violation = self.feed("content", getattr(delta, "content", None))
+        for call in getattr(delta, "tool_calls", None) or []:
+            function = getattr(call, "function", None)
+            violation = violation or self.feed(
+                ("tool", call.index), getattr(function, "arguments", None)
             )
+        return violation
 
-class CAFTA_Agent:
-    def __init__(self, model="nvidia_nim/mistralai/devstral-2-123b-instruct-2512"):
-        self.model = model
+    def partial_text(self):
+        return "\n".join(v for v in self.buffers.values() if v)
 
-    def run_cycle(self, user_request: str):
+def _close_stream(stream):
+    # Stop generation server-side: closing the HTTP response cancels it
+    for target in (stream, getattr(stream, "completion_stream", None)):
+        close = getattr(target, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                pass
 
+class CAFTA_Agent:
+    def __init__(
+        self,
+        model="nvidia_nim/mistralai/devstral-2-123b-instruct-2512",
+        use_cache=True,
+        api_base=NVIDIA_BASE_URL,
+        api_key=NVIDIA_API_KEY,
+        max_iterations=6,
+        stream=False
+    ):
+        self.model = model
+        # False forces every call to the model, e.g. to refresh cached answers
+        self.use_cache = use_cache
+        self.api_base = api_base
+        self.api_key = api_key
+        self.max_iterations = max_iterations
+        # Stream completions and abort as soon as an invalid chain appears
+        self.stream = stream
+
+    # ---------------------------
+    # Cycle steps (shared by run_cycle and arun_cycle)
+    # ---------------------------
+    def _start_cycle(self, user_request: str):
         self.read_called = False
         self.write_called = False
-        TARGET_FILE = "ixia_generated.py"
-
-        retrieved_context = retrieve_memory(user_request)
-
-        messages = [
+        self.written_code = []
+        # Per-cycle numbers for batch reports
+        self.stats = {
+            "iterations": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "symbols": [],
+            "aborted_streams": 0,
+            "rejected": 0,
+            "cache_hits": 0
+        }
+        self.trace = CycleTrace(self.model)
+
+        with self.trace.span("retrieval"):
+            retrieved_context = retrieve_memory(user_request)
+
+        return [
             {
                 "role": "system",
                 "content": SYSTEM_PROMPT
@@ -44,150 +197,302 @@ class CAFTA_Agent:
             {"role": "user", "content": user_request}
         ]
 
-
-        for _ in range(6):
-            response = completion(
-                model=self.model,
-                messages=messages,
-                temperature=0,
-                max_tokens=1024,  
-                api_key=NVIDIA_API_KEY,
-                custom_api_base=NVIDIA_BASE_URL,
-                tools=[
-                    {
-                        "type": "function",
-                        "function": {
-                            "name": "read_code",
-                            "parameters": {
-                                "type": "object",
-                                "properties": {
-                                    "file_path": {"type": "string"}
-                                },
-                                "required": ["file_path"]
-                            }
-                        }
-                    },
-                    {
-                        "type": "function",
-                        "function": {
-                            "name": "write_code",
-                            "parameters": {
-                                "type": "object",
-                                "properties": {
-                                    "file_path": {"type": "string"},
-                                    "new_code": {"type": "string"}
-                                },
-                                "required": ["file_path", "new_code"]
-                            }
-                        }
-                    }
-                ]
+    def _completion_args(self, messages):
+        return dict(
+            model=self.model,
+            messages=messages,
+            temperature=0,
+            max_tokens=1024,
+            api_key=self.api_key,
+            api_base=self.api_base,
+            custom_api_base=self.api_base,
+            tools=TOOLS,
+            bypass=not self.use_cache
+        )
+
+    def _stream_args(self, messages):
+        args = self._completion_args(messages)
+        args["stream"] = True
+        args["stream_options"] = {"include_usage": True}
+        return args
+
+    def _abort_stream(self, violation, validator, messages, user_request: str):
+        partial = validator.partial_text()
+        self.stats["aborted_streams"] += 1
+        self.trace.retry("aborted_stream")
+        self._store_correction(user_request, partial, [f"{HIERARCHY_ERROR} detected: {violation}"])
+        messages.append({"role": "assistant", "content": partial})
+        messages.append({
+            "role": "user",
+            "content": (
+                f"VALIDATION_ERROR: {HIERARCHY_ERROR} detected: {violation}. "
+                "Your answer was stopped. Regenerate it without this pattern."
             )
-
-            msg = response.choices[0].message
-            # print("DEBUG finish_reason:", response.choices[0].finish_reason)
-            # print("DEBUG assistant content:", msg.get("content"))
-            # print("DEBUG tool_calls:", msg.get("tool_calls"))
-
-
-            if msg.get("tool_calls"):
-                messages.append({
-                    "role": "assistant",
-                    "content": msg.get("content"),
-                    "tool_calls": msg["tool_calls"]
-                })
-
-                for call in msg["tool_calls"]:
-                    tool_name = call["function"]["name"]
-                    args = json.loads(call["function"]["arguments"])
-
-                    if tool_name == "read_code":
-                        result = read_code(**args)
-                        self.read_called = True
-
-                    elif tool_name == "write_code":
-                        if not self.read_called:
-                            result = "VALIDATION_ERROR: write attempted before read_code"
-                        else:
-                            try:
-                                validate_generated_code(args["new_code"])
-                                args["file_path"] = "ixia_generated.py"
-
-                                result = write_code(**args)
-                                self.write_called = True
-
-                            except ValueError as e:
-                                store_correction(
-                                    user_request,
-                                    args.get("new_code", ""),
-                                    f"ERROR: {str(e)}"
-                                )
-                                result = f"VALIDATION_ERROR: {str(e)}"
-
-
-
-                        result = write_code(**args)
-                    elif tool_name == "execute_test":
-                        result = execute_test(**args)
-                    else:
-                        result = f"ERROR: Unknown tool {tool_name}"
-
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": call["id"],
-                    "content": result
-                })
-
-                continue
-
+        })
+
+    def _streamed_completion(self, messages, user_request: str):
+        # Returns the assembled response, or None if the stream was aborted
+        stream = completion(**self._stream_args(messages))
+        validator = StreamValidator()
+        chunks = []
+        for chunk in stream:
+            chunks.append(chunk)
+            violation = validator.feed_chunk(chunk)
+            if violation:
+                _close_stream(stream)
+                self._abort_stream(violation, validator, messages, user_request)
+                return None
+        return stream_chunk_builder(chunks, messages=messages)
+
+    async def _astreamed_completion(self, messages, user_request: str):
+        stream = await acompletion(**self._stream_args(messages))
+        validator = StreamValidator()
+        chunks = []
+        async for chunk in stream:
+            chunks.append(chunk)
+            violation = validator.feed_chunk(chunk)
+            if violation:
+                aclose = getattr(stream, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+                else:
+                    _close_stream(stream)
+                await asyncio.to_thread(
+                    self._abort_stream, violation, validator, messages, user_request
+                )
+                return None
+        return stream_chunk_builder(chunks, messages=messages)
+
+    def _record_response(self, response):
+        self.stats["iterations"] += 1
+        if response is None:
+            return
+        if is_cache_hit(response):
+            # Replayed from disk: no tokens were spent
+            self.stats["cache_hits"] += 1
+            return
+        usage = getattr(response, "usage", None)
+        if usage:
+            self.stats["prompt_tokens"] += usage.prompt_tokens or 0
+            self.stats["completion_tokens"] += usage.completion_tokens or 0
+            self.trace.tokens(usage.prompt_tokens or 0, usage.completion_tokens or 0)
+
+    def _record_symbols(self, code: str):
+        for name in re.findall(r"^\s*def\s+(\w+)", code, re.MULTILINE):
+            if name not in self.stats["symbols"]:
+                self.stats["symbols"].append(name)
+
+    def _handle_tool_calls(self, msg, messages, user_request: str):
+        messages.append({
+            "role": "assistant",
+            "content": msg.get("content"),
+            "tool_calls": msg["tool_calls"]
+        })
+
+        for call in msg["tool_calls"]:
+            tool_name = call["function"]["name"]
+            args = json.loads(call["function"]["arguments"])
+            self.trace.tool_call(tool_name)
+
+            if tool_name in READ_TOOLS:
+                with self.trace.span("tools"):
+                    result = READ_TOOLS[tool_name](**args)
+                self.read_called = True
+
+            elif tool_name == "write_code":
+                if not self.read_called:
+                    result = "VALIDATION_ERROR: write attempted before read_code"
+                else:
+                    try:
+                        with self.trace.span("validation"):
+                            self._validate(args["new_code"], user_request)
+                        args["file_path"] = "ixia_generated.py"
+
+                        with self.trace.span("write"):
+                            result = write_code(**args)
+                        if result.startswith("SUCCESS"):
+                            self.write_called = True
+                            self.written_code.append(args["new_code"])
+                            self._record_symbols(args["new_code"])
+
+                    except ValueError as e:
+                        self.trace.retry("tool_validation")
+                        self._store_correction(user_request, args.get("new_code", ""), str(e).split("\n"))
+                        result = f"VALIDATION_ERROR: {str(e)}"
+
+            elif tool_name == "execute_test":
+                with self.trace.span("tools"):
+                    result = execute_test(**args)
             else:
-                generated_code = msg.get("content")
-
-                if not generated_code:
-                    raise RuntimeError("LLM returned empty response")
-
-                # Optional validation
-                validate_generated_code(generated_code)
-
-                # Write or append
-                write_code(
+                result = f"ERROR: Unknown tool {tool_name}"
+
+            # Every tool call needs its own tool message
+            messages.append({
+                "role": "tool",
+                "tool_call_id": call["id"],
+                "content": result
+            })
+
+    def _validate(self, code, user_request: str):
+        # A correction may redefine an existing API, and so may a later
+        # write of an API from this same cycle; anything else must be new
+        validate_generated_code(
+            code,
+            check_existing="WHAT WAS WRONG:" not in user_request,
+            allow=self.stats["symbols"]
+        )
+
+    def _store_correction(self, user_request, code, violations):
+        # Only hierarchy-rule breaks are remembered: corrections are packed
+        # first, and syntax, convention or duplicate-name rejections would
+        # only feed invalid code back as top-priority context
+        hierarchy = hierarchy_violations(violations)
+        if not hierarchy:
+            return
+        with self.trace.span("memory_write"):
+            store_correction(user_request, code, "ERROR: " + "\n".join(hierarchy))
+
+    def _reject(self, generated_code, error, messages, user_request: str):
+        self.stats["rejected"] += 1
+        self.trace.retry("rejected")
+        self._store_correction(user_request, generated_code, error.split("\n"))
+        messages.append({"role": "assistant", "content": generated_code})
+        messages.append({
+            "role": "user",
+            "content": (
+                f"VALIDATION_ERROR:\n{error}\n"
+                "Fix every issue listed above and regenerate the code."
+            )
+        })
+
+    def _finish(self, generated_code, messages, user_request: str):
+        if not generated_code:
+            raise RuntimeError("LLM returned empty response")
+
+        if self.write_called and "```" not in generated_code:
+            # Closing remark after write_code: the code is already written
+            result = "SUCCESS: " + ", ".join(self.stats["symbols"]) + " written to ixia_generated.py"
+            generated_code = "\n\n".join(self.written_code)
+        else:
+            try:
+                with self.trace.span("validation"):
+                    self._validate(generated_code, user_request)
+            except ValueError as e:
+                self._reject(generated_code, str(e), messages, user_request)
+                return None
+
+            # Merged by symbol, so repeating code already written is a no-op
+            with self.trace.span("write"):
+                result = write_code(
                     file_path="ixia_generated.py",
-                    new_code="\n\n" + generated_code
+                    new_code=generated_code
+                )
+            if not result.startswith("SUCCESS"):
+                self._reject(generated_code, result, messages, user_request)
+                return None
+            self._record_symbols(generated_code)
+
+
+        is_correction = "WHAT WAS WRONG:" in user_request
+
+        with self.trace.span("memory_write"):
+            if is_correction:
+                store(
+                    text=f"Q:\n{user_request}\n\nA:\n{generated_code}",
+                    metadata={
+                        "type": "correction",
+                        "confidence": "high",
+                        "source": "human"
+                    }
+                )
+            else:
+                store(
+                    text=f"Q:\n{user_request}\n\nA:\n{generated_code}",
+                    metadata={
+                        "type": "validated_generation",
+                        "confidence": "medium",
+                        "source": "agent"
+                    }
                 )
 
+        return result
 
-                is_correction = "WHAT WAS WRONG:" in user_request
-
-                if is_correction:
-                    store(
-                        text=f"Q:\n{user_request}\n\nA:\n{generated_code}",
-                        metadata={
-                            "type": "correction",
-                            "confidence": "high",
-                            "source": "human"
-                        }
-                    )
-                else:
-                    store(
-                        text=f"Q:\n{user_request}\n\nA:\n{generated_code}",
-                        metadata={
-                            "type": "validated_generation",
-                            "confidence": "medium",
-                            "source": "agent"
-                        }
-                    )
-
+    # ---------------------------
+    # Entry points
+    # ---------------------------
+    def run_cycle(self, user_request: str):
 
-                return "SUCCESS: Code written to cafy_apis/ixia_generated.py"
+        messages = self._start_cycle(user_request)
+        status = "error"
 
+        try:
+            for _ in range(self.max_iterations):
+                self.trace.iteration(messages)
+                with self.trace.span("llm"):
+                    if self.stream:
+                        response = self._streamed_completion(messages, user_request)
+                    else:
+                        response = completion(**self._completion_args(messages))
+                self._record_response(response)
+                if response is None:
+                    # Aborted mid-stream; the violation is already in messages
+                    continue
+
+                msg = response.choices[0].message
+                # print("DEBUG finish_reason:", response.choices[0].finish_reason)
+                # print("DEBUG assistant content:", msg.get("content"))
+                # print("DEBUG tool_calls:", msg.get("tool_calls"))
+
+                if msg.get("tool_calls"):
+                    self._handle_tool_calls(msg, messages, user_request)
+                    continue
+
+                result = self._finish(msg.get("content"), messages, user_request)
+                if result is not None:
+                    status = "success"
+                    return result
+
+            status = "not_converged"
+            return "Agent did not converge"
+        finally:
+            self.trace.finish(status)
+
+    async def arun_cycle(self, user_request: str):
+        """
+        Async run_cycle: the model call is awaited (litellm.acompletion) and
+        retrieval, tools and memory writes run in worker threads, so many
+        cycles can be in flight on one event loop. An agent instance runs
+        one cycle at a time; use one instance per concurrent request.
+        """
+        messages = await asyncio.to_thread(self._start_cycle, user_request)
+        status = "error"
+
+        try:
+            for _ in range(self.max_iterations):
+                self.trace.iteration(messages)
+                with self.trace.span("llm"):
+                    if self.stream:
+                        response = await self._astreamed_completion(messages, user_request)
+                    else:
+                        response = await acompletion(**self._completion_args(messages))
+                self._record_response(response)
+                if response is None:
+                    continue
 
-            # else:
-            #     # Assistant replied without tool calls — keep it in the loop
-            #     messages.append({
-            #         "role": "assistant",
-            #         "content": msg.get("content")
-            #     })
-            #     continue
+                msg = response.choices[0].message
 
+                if msg.get("tool_calls"):
+                    await asyncio.to_thread(self._handle_tool_calls, msg, messages, user_request)
+                    continue
 
-        return "Agent did not converge"
+                result = await asyncio.to_thread(
+                    self._finish, msg.get("content"), messages, user_request
+                )
+                if result is not None:
+                    status = "success"
+                    return result
+
+            status = "not_converged"
+            return "Agent did not converge"
+        finally:
+            self.trace.finish(status)
@@ -0,0 +1,51 @@
+# agent_core/batch.py
+import asyncio
+import time
+
+from .agent import CAFTA_Agent
+
+async def arun_batch(intents, concurrency: int = 4, agent_factory=CAFTA_Agent, on_result=None):
+    """
+    Run every intent through its own agent with at most `concurrency`
+    cycles in flight. intents may be any iterable (e.g. a generator over a
+    file); it is consumed only as slots free up. Returns one record per
+    intent, in input order; on_result(record) is also called as each one
+    completes.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(position, intent):
+        try:
+            agent = None
+            start = time.perf_counter()
+            try:
+                # A failure to build the agent fails this intent, not the batch
+                agent = agent_factory()
+                result = await agent.arun_cycle(intent)
+                status = "success" if result.startswith("SUCCESS") else "not_converged"
+            except Exception as e:
+                result = f"ERROR: {e}"
+                status = "error"
+
+            record = {
+                "position": position,
+                "status": status,
+                "result": result,
+                "latency_s": round(time.perf_counter() - start, 3),
+                **getattr(agent, "stats", {})
+            }
+            if on_result is not None:
+                on_result(record)
+            return record
+        finally:
+            semaphore.release()
+
+    tasks = []
+    for position, intent in enumerate(intents):
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(run_one(position, intent)))
+
+    return await asyncio.gather(*tasks)
+
+def run_batch(intents, concurrency: int = 4, agent_factory=CAFTA_Agent, on_result=None):
+    return asyncio.run(arun_batch(intents, concurrency, agent_factory, on_result))
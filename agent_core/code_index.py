@@ -0,0 +1,128 @@
+# agent_core/code_index.py
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+from rag.chunker import chunk_source
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+BASE_API_DIR = PROJECT_ROOT / "cafy_apis"
+CODE_INDEX_PATH = PROJECT_ROOT / "data" / "code_index.json"
+
+# ---------------------------
+# Symbol index of cafy_apis
+# ---------------------------
+# file -> {"mtime_ns", "size", "symbols": [...]}, one entry per function,
+# method and method-less class (see rag.chunker). Cached on disk and
+# re-parsed per file only when its mtime or size changes. Sources are not
+# cached: symbols are read back from the file by line range.
+_index = None
+
+# Batch mode validates and writes from worker threads, each of which may
+# refresh the index after a write to ixia_generated.py
+_lock = threading.Lock()
+
+def _file_sig(path):
+    st = path.stat()
+    return st.st_mtime_ns, st.st_size
+
+def _parse(path):
+    rel = path.relative_to(BASE_API_DIR).as_posix()
+    symbols = []
+    for chunk in chunk_source(rel, path.read_text(encoding="utf-8")):
+        summary = chunk["docstring"].strip().split("\n", 1)[0]
+        symbols.append({
+            "qualname": chunk["qualname"],
+            "kind": chunk["kind"],
+            "signature": chunk["signature"],
+            "summary": summary,
+            "start": chunk["start_lineno"],
+            "end": chunk["end_lineno"]
+        })
+    return symbols
+
+def _save(index):
+    CODE_INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = CODE_INDEX_PATH.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_text(json.dumps(index), encoding="utf-8")
+    os.replace(tmp_path, CODE_INDEX_PATH)
+
+def get_index():
+    global _index
+
+    with _lock:
+        if _index is None:
+            try:
+                _index = json.loads(CODE_INDEX_PATH.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                _index = {}
+
+        # Updated on a copy: callers may still be iterating the previous one
+        index = dict(_index)
+        changed = False
+        present = set()
+        for path in sorted(BASE_API_DIR.glob("*.py")):
+            rel = path.relative_to(BASE_API_DIR).as_posix()
+            try:
+                mtime_ns, size = _file_sig(path)
+            except FileNotFoundError:
+                continue
+            present.add(rel)
+            entry = index.get(rel)
+            if entry and entry["mtime_ns"] == mtime_ns and entry["size"] == size:
+                continue
+            try:
+                symbols = _parse(path)
+            except SyntaxError:
+                # Keep serving the last good parse of a file mid-edit
+                symbols = entry["symbols"] if entry else []
+            except FileNotFoundError:
+                continue
+            index[rel] = {"mtime_ns": mtime_ns, "size": size, "symbols": symbols}
+            changed = True
+
+        for rel in set(index) - present:
+            del index[rel]
+            changed = True
+
+        if changed:
+            _save(index)
+            _index = index
+        return _index
+
+def find_symbols(name, file_path=None):
+    # Exact qualname ("IXIA.get_traffic_items") or bare name ("get_traffic_items")
+    matches = []
+    for rel, entry in get_index().items():
+        if file_path and rel != file_path:
+            continue
+        for symbol in entry["symbols"]:
+            if symbol["qualname"] == name or symbol["qualname"].rsplit(".", 1)[-1] == name:
+                matches.append((rel, symbol))
+    return matches
+
+def symbol_source(rel, symbol):
+    lines = (BASE_API_DIR / rel).read_text(encoding="utf-8").splitlines()
+    return "\n".join(lines[symbol["start"] - 1:symbol["end"]])
+
+def symbol_at(rel, lineno):
+    for symbol in get_index().get(rel, {}).get("symbols", []):
+        if symbol["start"] <= lineno <= symbol["end"]:
+            return symbol["qualname"]
+    return None
+
+def grep(pattern, max_hits=20, file_path=None):
+    regex = re.compile(pattern)
+    hits = []
+    for rel in get_index():
+        if file_path and rel != file_path:
+            continue
+        with open(BASE_API_DIR / rel, "r", encoding="utf-8") as f:
+            for lineno, line in enumerate(f, 1):
+                if regex.search(line):
+                    hits.append((rel, lineno, symbol_at(rel, lineno), line.rstrip()))
+                    if len(hits) >= max_hits:
+                        return hits
+    return hits
@@ -0,0 +1,202 @@
+# agent_core/code_writer.py
+import ast
+import os
+import textwrap
+import threading
+
+from filelock import FileLock
+
+from config import LOCK_TIMEOUT
+from .validator import extract_code
+
+# One writer at a time per process (batch mode runs tools in threads), and
+# across processes a file lock next to the target (_locked): read, merge
+# and replace must not interleave or one writer's APIs are lost
+_lock = threading.Lock()
+
+_DEFS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+# ---------------------------
+# Helpers
+# ---------------------------
+def _span(node):
+    # 0-based [start, end) line range, decorators included
+    start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+    return start - 1, node.end_lineno
+
+def _segment(lines, node, indent):
+    start, end = _span(node)
+    text = textwrap.dedent("\n".join(lines[start:end]))
+    return textwrap.indent(text, indent).split("\n")
+
+def _container(tree):
+    # ixia_generated.py is a single class (Cafy) holding every API
+    classes = [n for n in tree.body if isinstance(n, ast.ClassDef)]
+    return classes[0] if len(classes) == 1 else None
+
+def _is_method(node):
+    args = getattr(node, "args", None)
+    return bool(args and args.args and args.args[0].arg == "self")
+
+def _defs(body):
+    found = {}
+    for node in body:
+        if isinstance(node, _DEFS):
+            found.setdefault(node.name, []).append(node)
+    return found
+
+def _removal(lines, node):
+    # Drop a definition together with the blank lines after it
+    start, end = _span(node)
+    while end < len(lines) and not lines[end].strip():
+        end += 1
+    return start, end, []
+
+# ---------------------------
+# Merge
+# ---------------------------
+def merge(source: str, new_code: str, on_conflict: str = "replace"):
+    """
+    Merge new_code into source by symbol instead of appending it.
+    Methods (first argument `self`, or the body of a class with the same
+    name) go into the file's class; other functions, classes and statements
+    are module level. A definition whose name already exists replaces the
+    last existing one (on_conflict="replace") or is left out ("skip");
+    identical ones are no-ops, and older duplicates of a replaced name are
+    removed. Returns (merged_source, report).
+    """
+    code = extract_code(new_code)
+    new_lines = code.split("\n")
+    new_tree = ast.parse(code)
+
+    lines = source.split("\n") if source.strip() else []
+    tree = ast.parse(source) if lines else ast.Module(body=[], type_ignores=[])
+    cls = _container(tree)
+
+    methods, functions, statements = {}, {}, []
+    for node in new_tree.body:
+        if isinstance(node, ast.ClassDef) and cls is not None and node.name == cls.name:
+            for child in node.body:
+                if isinstance(child, _DEFS):
+                    methods[child.name] = (child, _segment(new_lines, child, "    "))
+        elif isinstance(node, _DEFS) and cls is not None and _is_method(node):
+            methods[node.name] = (node, _segment(new_lines, node, "    "))
+        elif isinstance(node, _DEFS):
+            functions[node.name] = (node, _segment(new_lines, node, ""))
+        else:
+            statements.append((node, _segment(new_lines, node, "")))
+
+    report = {"added": [], "replaced": [], "unchanged": [], "skipped": []}
+    edits = []
+
+    def place(units, existing, qualifier, insert_at):
+        added = []
+        for name, (node, segment) in units.items():
+            qualname = f"{qualifier}.{name}" if qualifier else name
+            current = existing.get(name)
+            if not current:
+                added.extend([""] + segment)
+                report["added"].append(qualname)
+            elif ast.dump(current[-1]) == ast.dump(node):
+                report["unchanged"].append(qualname)
+            elif on_conflict == "skip":
+                report["skipped"].append(qualname)
+            else:
+                start, end = _span(current[-1])
+                edits.append((start, end, segment))
+                edits.extend(_removal(lines, old) for old in current[:-1])
+                report["replaced"].append(qualname)
+        if added:
+            edits.append((insert_at, insert_at, added))
+
+    if cls is not None:
+        place(methods, _defs(cls.body), cls.name, cls.end_lineno)
+    place(functions, _defs(tree.body), "", len(lines))
+
+    # Imports and other statements: only if not already present
+    present = {ast.dump(node) for node in tree.body}
+    imports = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+    import_at = imports[-1].end_lineno if imports else 0
+    new_imports, new_other = [], []
+    for node, segment in statements:
+        if ast.dump(node) in present:
+            continue
+        present.add(ast.dump(node))
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            new_imports.extend(segment)
+        else:
+            new_other.extend([""] + segment)
+    if new_imports:
+        edits.append((import_at, import_at, new_imports))
+    if new_other:
+        edits.append((len(lines), len(lines), new_other))
+
+    # Bottom up so earlier line numbers stay valid
+    for start, end, replacement in sorted(edits, key=lambda e: (e[0], e[1]), reverse=True):
+        lines[start:end] = replacement
+
+    merged = "\n".join(lines).rstrip("\n") + "\n"
+    ast.parse(merged)
+    return merged, report
+
+def dedupe(source: str):
+    """
+    Remove every definition that a later one of the same name shadows
+    (only the last one is ever used), e.g. from files built by appending.
+    """
+    lines = source.split("\n")
+    tree = ast.parse(source)
+    cls = _container(tree)
+
+    edits, removed = [], []
+    scopes = [(tree.body, "")] + ([(cls.body, cls.name)] if cls is not None else [])
+    for body, qualifier in scopes:
+        for name, nodes in _defs(body).items():
+            for node in nodes[:-1]:
+                edits.append(_removal(lines, node))
+                removed.append(f"{qualifier}.{name}" if qualifier else name)
+
+    for start, end, replacement in sorted(edits, reverse=True):
+        lines[start:end] = replacement
+    return "\n".join(lines).rstrip("\n") + "\n", removed
+
+# ---------------------------
+# File writes
+# ---------------------------
+def _atomic_write(path, text):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _locked(path):
+    return FileLock(f"{path}.lock", timeout=LOCK_TIMEOUT)
+
+def write_symbols(path, new_code: str, on_conflict: str = "replace"):
+    # Returns the merge report; the file is only rewritten if something changed
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _lock, _locked(path):
+        source = path.read_text(encoding="utf-8") if path.exists() else ""
+        merged, report = merge(source, new_code, on_conflict)
+        if merged != source:
+            _atomic_write(path, merged)
+        return report
+
+def format_report(file_path: str, report) -> str:
+    parts = [f"{key}: {', '.join(names)}" for key, names in report.items() if names]
+    return f"{file_path}: " + ("; ".join(parts) if parts else "nothing to write")
+
+if __name__ == "__main__":
+    # python -m agent_core.code_writer <file>
+    # Removes shadowed duplicate definitions from an appended-to file.
+    import sys
+    from pathlib import Path
+
+    path = Path(sys.argv[1])
+    with _lock, _locked(path):
+        cleaned, removed = dedupe(path.read_text(encoding="utf-8"))
+        if removed:
+            _atomic_write(path, cleaned)
+    print(f"removed {len(removed)} shadowed definitions: {', '.join(removed) or '-'}")
@@ -0,0 +1,165 @@
+# agent_core/llm_cache.py
+import asyncio
+import hashlib
+import json
+import os
+import threading
+
+from litellm import (
+    completion as litellm_completion,
+    acompletion as litellm_acompletion,
+    ModelResponse
+)
+
+from config import LLM_CACHE_ENABLED, LLM_CACHE_DIR, LLM_CACHE_MAX_BYTES
+
+# Request fields that do not change the answer, or must not end up in a
+# key. The endpoint (api_base / base_url) is keyed: the same model name
+# behind another server (e.g. the benchmark stand-in) answers differently.
+_UNKEYED = {"api_key", "timeout", "stream"}
+
+_evict_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+# Bytes in the cache as last counted, plus what this process wrote since.
+# The tree is only walked when that passes LLM_CACHE_MAX_BYTES, or every
+# _RESCAN_EVERY writes to pick up other processes' entries; eviction then
+# goes down to _LOW_WATER so the next walk is far off.
+_RESCAN_EVERY = 500
+_LOW_WATER = 0.9
+_size = None
+_puts = 0
+
+def _jsonable(obj):
+    # Assistant messages fed back into the history carry litellm objects
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "dict"):
+        return obj.dict()
+    return str(obj)
+
+def cache_key(**request) -> str:
+    keyed = {k: v for k, v in request.items() if k not in _UNKEYED}
+    payload = json.dumps(keyed, sort_keys=True, default=_jsonable, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _path(key):
+    return os.path.join(LLM_CACHE_DIR, key[:2], key + ".json")
+
+def get(key):
+    path = _path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # mtime doubles as last-use time for eviction
+    os.utime(path)
+    return data
+
+def put(key, data):
+    global _size, _puts
+
+    path = _path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    written = os.path.getsize(tmp_path)
+    os.replace(tmp_path, path)
+
+    with _evict_lock:
+        _puts += 1
+        if _size is not None:
+            _size += written
+        if _size is None or _size > LLM_CACHE_MAX_BYTES or _puts % _RESCAN_EVERY == 0:
+            _evict()
+
+def _evict():
+    # Caller holds _evict_lock
+    global _size
+
+    entries = []
+    for root, _, files in os.walk(LLM_CACHE_DIR):
+        for name in files:
+            if name.endswith(".json"):
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    if total > LLM_CACHE_MAX_BYTES:
+        for _, size, path in sorted(entries):
+            if total <= LLM_CACHE_MAX_BYTES * _LOW_WATER:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+    _size = total
+
+def cache_stats():
+    return dict(_stats)
+
+# ---------------------------
+# Cached completion
+# ---------------------------
+def _cacheable(bypass, request):
+    return (
+        LLM_CACHE_ENABLED
+        and not bypass
+        and not request.get("stream")
+        and request.get("temperature") == 0
+    )
+
+def _lookup(key):
+    data = get(key)
+    if data is None:
+        _stats["misses"] += 1
+        return None
+    _stats["hits"] += 1
+    response = ModelResponse(**data)
+    # Keeps the recorded usage for reference; callers count no tokens
+    response._hidden_params["cache_hit"] = True
+    return response
+
+def is_cache_hit(response) -> bool:
+    return bool((getattr(response, "_hidden_params", None) or {}).get("cache_hit"))
+
+def completion(bypass: bool = False, **request):
+    """
+    Drop-in for litellm.completion. Deterministic requests are answered
+    from the on-disk cache when an identical request was seen before,
+    including the exact tool calls (and their ids) the model returned.
+    bypass=True always calls the model and does not store the answer.
+    """
+    if not _cacheable(bypass, request):
+        return litellm_completion(**request)
+
+    key = cache_key(**request)
+    cached = _lookup(key)
+    if cached is not None:
+        return cached
+
+    response = litellm_completion(**request)
+    put(key, response.model_dump())
+    return response
+
+async def acompletion(bypass: bool = False, **request):
+    # Async counterpart of completion(), sharing the same cache
+    if not _cacheable(bypass, request):
+        return await litellm_acompletion(**request)
+
+    # Disk I/O off the event loop, so other cycles keep running
+    key = cache_key(**request)
+    cached = await asyncio.to_thread(_lookup, key)
+    if cached is not None:
+        return cached
+
+    response = await litellm_acompletion(**request)
+    await asyncio.to_thread(put, key, response.model_dump())
+    return response
@@ -0,0 +1,287 @@
+# agent_core/telemetry.py
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+from config import TELEMETRY_ENABLED, TELEMETRY_PATH, TELEMETRY_PROM_PATH
+
+_lock = threading.Lock()
+
+# Process-wide totals behind the Prometheus textfile
+_totals = {
+    "cycles": defaultdict(int),          # status -> count
+    "cycle_seconds": 0.0,
+    "step_seconds": defaultdict(float),  # step -> seconds
+    "step_count": defaultdict(int),
+    "tokens": defaultdict(int),          # prompt / completion
+    "tool_calls": defaultdict(int),      # tool name -> count
+    "retries": defaultdict(int),         # reason -> count
+    "iterations": 0
+}
+
+# ---------------------------
+# Per-cycle trace
+# ---------------------------
+class CycleTrace:
+    """
+    Timings and counters for one agent cycle. Steps before the first
+    iteration (retrieval) are kept under "setup"; everything else goes to
+    the current iteration.
+    """
+
+    def __init__(self, model: str = None):
+        self.record = {
+            "cycle_id": uuid.uuid4().hex,
+            "ts": time.time(),
+            "model": model,
+            "setup": _bucket(),
+            "iterations": []
+        }
+        self._current = self.record["setup"]
+        self._stack = []
+        self._start = time.perf_counter()
+
+    def iteration(self, messages):
+        self._current = _bucket()
+        self._current["messages"] = len(messages)
+        self._current["message_chars"] = sum(len(m.get("content") or "") for m in messages)
+        self.record["iterations"].append(self._current)
+
+    @contextmanager
+    def span(self, step: str):
+        # Self time: a span nested in another (e.g. the memory write of an
+        # aborted stream inside "llm") is not counted twice
+        frame = [0.0]
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][0] += elapsed
+            spans = self._current["spans"]
+            spans[step] = spans.get(step, 0.0) + elapsed - frame[0]
+
+    def tokens(self, prompt: int, completion: int):
+        self._current["prompt_tokens"] += prompt
+        self._current["completion_tokens"] += completion
+
+    def tool_call(self, name: str):
+        calls = self._current["tool_calls"]
+        calls[name] = calls.get(name, 0) + 1
+
+    def retry(self, reason: str):
+        retries = self._current["retries"]
+        retries[reason] = retries.get(reason, 0) + 1
+
+    def finish(self, status: str):
+        record = self.record
+        record["status"] = status
+        record["duration_s"] = time.perf_counter() - self._start
+        record["totals"] = _summarize(record)
+
+        if TELEMETRY_ENABLED:
+            try:
+                _emit(record)
+            except Exception as e:
+                # Runs in run_cycle's finally: never replace the cycle's result
+                print(f"[telemetry] could not write cycle {record['cycle_id']}: {e}")
+        return record
+
+def _bucket():
+    return {
+        "spans": {},
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "tool_calls": {},
+        "retries": {}
+    }
+
+def _summarize(record):
+    totals = _bucket()
+    for bucket in [record["setup"]] + record["iterations"]:
+        for step, seconds in bucket["spans"].items():
+            totals["spans"][step] = totals["spans"].get(step, 0.0) + seconds
+        totals["prompt_tokens"] += bucket["prompt_tokens"]
+        totals["completion_tokens"] += bucket["completion_tokens"]
+        for key in ("tool_calls", "retries"):
+            for name, n in bucket[key].items():
+                totals[key][name] = totals[key].get(name, 0) + n
+    totals["iterations"] = len(record["iterations"])
+    totals["max_messages"] = max((it["messages"] for it in record["iterations"]), default=0)
+    return totals
+
+# ---------------------------
+# Output
+# ---------------------------
+def _emit(record):
+    line = json.dumps(record) + "\n"
+    totals = record["totals"]
+
+    with _lock:
+        os.makedirs(os.path.dirname(TELEMETRY_PATH) or ".", exist_ok=True)
+        with open(TELEMETRY_PATH, "a", encoding="utf-8") as f:
+            f.write(line)
+
+        _totals["cycles"][record["status"]] += 1
+        _totals["cycle_seconds"] += record["duration_s"]
+        _totals["iterations"] += totals["iterations"]
+        _totals["tokens"]["prompt"] += totals["prompt_tokens"]
+        _totals["tokens"]["completion"] += totals["completion_tokens"]
+        for bucket in [record["setup"]] + record["iterations"]:
+            for step, seconds in bucket["spans"].items():
+                _totals["step_seconds"][step] += seconds
+                _totals["step_count"][step] += 1
+        for name, n in totals["tool_calls"].items():
+            _totals["tool_calls"][name] += n
+        for reason, n in totals["retries"].items():
+            _totals["retries"][reason] += n
+
+        _write_prom()
+
+def _write_prom():
+    # Read per call, not at import: batch workers may be forked
+    pid = f'pid="{os.getpid()}"'
+    lines = [
+        "# HELP cafta_cycles_total Agent cycles by final status.",
+        "# TYPE cafta_cycles_total counter"
+    ]
+    lines += [f'cafta_cycles_total{{{pid},status="{s}"}} {n}' for s, n in sorted(_totals["cycles"].items())]
+
+    lines += [
+        "# HELP cafta_cycle_seconds_total Wall time spent in agent cycles.",
+        "# TYPE cafta_cycle_seconds_total counter",
+        f'cafta_cycle_seconds_total{{{pid}}} {_totals["cycle_seconds"]:.6f}',
+        "# HELP cafta_iterations_total LLM iterations across all cycles.",
+        "# TYPE cafta_iterations_total counter",
+        f'cafta_iterations_total{{{pid}}} {_totals["iterations"]}',
+        "# HELP cafta_step_seconds_total Time spent per cycle step.",
+        "# TYPE cafta_step_seconds_total counter"
+    ]
+    lines += [f'cafta_step_seconds_total{{{pid},step="{s}"}} {v:.6f}' for s, v in sorted(_totals["step_seconds"].items())]
+
+    lines += [
+        "# HELP cafta_step_total Executions per cycle step.",
+        "# TYPE cafta_step_total counter"
+    ]
+    lines += [f'cafta_step_total{{{pid},step="{s}"}} {n}' for s, n in sorted(_totals["step_count"].items())]
+
+    lines += [
+        "# HELP cafta_tokens_total LLM tokens by direction.",
+        "# TYPE cafta_tokens_total counter"
+    ]
+    lines += [f'cafta_tokens_total{{{pid},direction="{d}"}} {n}' for d, n in sorted(_totals["tokens"].items())]
+
+    lines += [
+        "# HELP cafta_tool_calls_total Tool calls by tool name.",
+        "# TYPE cafta_tool_calls_total counter"
+    ]
+    lines += [f'cafta_tool_calls_total{{{pid},tool="{t}"}} {n}' for t, n in sorted(_totals["tool_calls"].items())]
+
+    lines += [
+        "# HELP cafta_retries_total Extra LLM turns caused by rejected output.",
+        "# TYPE cafta_retries_total counter"
+    ]
+    lines += [f'cafta_retries_total{{{pid},reason="{r}"}} {n}' for r, n in sorted(_totals["retries"].items())]
+
+    # textfile collector must never see a half written file
+    path = _prom_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+def _prom_path():
+    # One textfile per process (data/cafta.<pid>.prom): each only knows its
+    # own totals, so a shared file would jump between processes' counters.
+    # The pid label keeps the series distinct for the collector.
+    root, ext = os.path.splitext(TELEMETRY_PROM_PATH)
+    return f"{root}.{os.getpid()}{ext}"
+
+# ---------------------------
+# Report
+# ---------------------------
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+def load(path: str = TELEMETRY_PATH):
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+def report(path: str = TELEMETRY_PATH):
+    """
+    Aggregate a telemetry JSONL file: cycle outcomes and latency, time per
+    step (and its share of cycle time), tokens, tool calls, retries and
+    message-history size.
+    """
+    records = load(path)
+    if not records:
+        return {"cycles": 0}
+
+    durations = [r["duration_s"] for r in records]
+    total_time = sum(durations)
+    statuses = defaultdict(int)
+    steps = defaultdict(list)
+    tool_calls = defaultdict(int)
+    retries = defaultdict(int)
+
+    for r in records:
+        statuses[r["status"]] += 1
+        for step, seconds in r["totals"]["spans"].items():
+            steps[step].append(seconds)
+        for name, n in r["totals"]["tool_calls"].items():
+            tool_calls[name] += n
+        for reason, n in r["totals"]["retries"].items():
+            retries[reason] += n
+
+    def per_cycle(key):
+        values = [r["totals"][key] for r in records]
+        return {"mean": round(sum(values) / len(values), 2), "max": max(values)}
+
+    return {
+        "cycles": len(records),
+        "status": dict(statuses),
+        "cycle_s": {
+            "p50": round(_percentile(durations, 0.50), 3),
+            "p95": round(_percentile(durations, 0.95), 3),
+            "mean": round(total_time / len(records), 3)
+        },
+        "steps": {
+            step: {
+                "total_s": round(sum(values), 3),
+                "share": round(sum(values) / total_time, 3) if total_time else 0.0,
+                "p50_s": round(_percentile(values, 0.50), 3),
+                "p95_s": round(_percentile(values, 0.95), 3)
+            }
+            for step, values in sorted(steps.items(), key=lambda kv: -sum(kv[1]))
+        },
+        "iterations": per_cycle("iterations"),
+        "prompt_tokens": per_cycle("prompt_tokens"),
+        "completion_tokens": per_cycle("completion_tokens"),
+        "max_messages": per_cycle("max_messages"),
+        "tool_calls": dict(tool_calls),
+        "retries": dict(retries)
+    }
+
+if __name__ == "__main__":
+    # python -m agent_core.telemetry report [telemetry.jsonl]
+    if len(sys.argv) < 2 or sys.argv[1] != "report":
+        sys.exit("usage: python -m agent_core.telemetry report [path]")
+    print(json.dumps(report(*sys.argv[2:3]), indent=2))
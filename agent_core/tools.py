@@ -1,8 +1,13 @@
 from pathlib import Path
 
+from . import code_index, code_writer
+
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 BASE_API_DIR = PROJECT_ROOT / "cafy_apis"
 
+MAX_SYMBOL_LISTING = 200
+MAX_SYMBOL_CHARS = 20000
+
 def read_code(file_path: str) -> str:
     full_path = BASE_API_DIR / file_path
     try:
@@ -11,13 +16,66 @@ def read_code(file_path: str) -> str:
     except Exception as e:
         return f"ERROR: {e}"
 
-def write_code(file_path: str, new_code: str) -> str:
-    full_path = BASE_API_DIR / file_path
-    full_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(full_path, "a", encoding="utf-8") as f:
-        f.write("\n\n" + new_code.strip() + "\n")
+def list_symbols(file_path: str = None, contains: str = None) -> str:
+    try:
+        index = code_index.get_index()
+    except Exception as e:
+        return f"ERROR: {e}"
+
+    lines = []
+    for rel, entry in index.items():
+        if file_path and rel != file_path:
+            continue
+        for symbol in entry["symbols"]:
+            if contains and contains.lower() not in symbol["qualname"].lower():
+                continue
+            lines.append(f"{rel}:{symbol['start']} {symbol['qualname']}: {symbol['signature']}"
+                         + (f"  # {symbol['summary']}" if symbol["summary"] else ""))
+
+    if not lines:
+        return "NO_SYMBOLS_FOUND"
+    if len(lines) > MAX_SYMBOL_LISTING:
+        more = len(lines) - MAX_SYMBOL_LISTING
+        lines = lines[:MAX_SYMBOL_LISTING] + [f"... {more} more, narrow with file_path or contains"]
+    return "\n".join(lines)
+
+def read_symbol(name: str, file_path: str = None) -> str:
+    try:
+        matches = code_index.find_symbols(name, file_path)
+    except Exception as e:
+        return f"ERROR: {e}"
+
+    if not matches:
+        return f"ERROR: No symbol named {name}"
+    if len(matches) > 1:
+        return "AMBIGUOUS: " + ", ".join(f"{rel}:{s['qualname']}" for rel, s in matches)
+
+    rel, symbol = matches[0]
+    source = code_index.symbol_source(rel, symbol)
+    return f"# {rel}:{symbol['start']}-{symbol['end']} {symbol['qualname']}\n{source[:MAX_SYMBOL_CHARS]}"
+
+def grep_code(pattern: str, max_hits: int = 20, file_path: str = None) -> str:
+    try:
+        hits = code_index.grep(pattern, max_hits, file_path)
+    except Exception as e:
+        return f"ERROR: {e}"
+
+    if not hits:
+        return "NO_MATCHES"
+    return "\n".join(
+        f"{rel}:{lineno} [{symbol or '<module>'}] {line.strip()}"
+        for rel, lineno, symbol, line in hits
+    )
+
+def write_code(file_path: str, new_code: str, on_conflict: str = "replace") -> str:
+    # Merged by symbol: redefinitions replace (or skip) the existing API
+    # instead of piling up duplicates, and the file is replaced atomically
+    try:
+        report = code_writer.write_symbols(BASE_API_DIR / file_path, new_code, on_conflict)
+    except SyntaxError as e:
+        return f"ERROR: {file_path} not written, code does not parse: {e}"
 
-    return f"SUCCESS: Appended code to {file_path}"
+    return "SUCCESS: " + code_writer.format_report(file_path, report)
 
 
 def execute_test(command: str) -> str:
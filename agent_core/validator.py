@@ -0,0 +1,167 @@
+# agent_core/validator.py
+import ast
+import re
+import textwrap
+
+from . import code_index
+
+INVALID_PATTERNS = [
+    "Vport.find().DeviceGroup",
+    "Vport.DeviceGroup",
+]
+
+TARGET_FILE = "ixia_generated.py"
+
+# Object chaining rules from the system prompt:
+#   IxNetwork -> Topology -> DeviceGroup -> Ethernet -> IPv4 / IPv6
+#   IxNetwork -> Topology -> DeviceGroup -> NetworkGroup -> DeviceGroup
+# child node -> nodes it may be created (.add()) directly under
+ALLOWED_PARENTS = {
+    "DeviceGroup": {"Topology", "DeviceGroup", "NetworkGroup"},
+    "Ethernet": {"DeviceGroup"},
+    "Ipv4": {"Ethernet"},
+    "Ipv6": {"Ethernet"},
+}
+
+GENERIC_EXCEPTIONS = {"Exception", "BaseException"}
+
+# Prefix of every object-hierarchy violation (patterns and chaining); only
+# these are worth remembering as corrections
+HIERARCHY_ERROR = "Invalid IxNetwork object hierarchy"
+
+_FUNCS = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+_FENCE = re.compile(r"```(?:python)?\s*\n(.*?)```", re.DOTALL)
+
+def extract_code(text: str) -> str:
+    # The model is told to wrap its answer in a ```python block
+    blocks = _FENCE.findall(text)
+    code = "\n\n".join(blocks) if blocks else text
+    return textwrap.dedent(code).strip("\n")
+
+def _chain_parent(node):
+    """
+    The IxNetwork node an expression hangs off: for
+    `topology.DeviceGroup.add().Ethernet` it is "DeviceGroup". Calls such
+    as .add() / .find() are skipped. Plain variables return None (their
+    type is unknown statically); `self.ixNetwork` returns "ixNetwork".
+    """
+    while True:
+        if isinstance(node, ast.Call):
+            node = node.func
+            if isinstance(node, ast.Attribute) and node.attr in ("add", "find"):
+                node = node.value
+            continue
+        if isinstance(node, ast.Attribute):
+            return node.attr
+        return None
+
+def _check_chains(tree, violations):
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call)
+                and isinstance(node.func, ast.Attribute)
+                and node.func.attr == "add"
+                and isinstance(node.func.value, ast.Attribute)):
+            continue
+
+        child = node.func.value.attr
+        allowed = ALLOWED_PARENTS.get(child)
+        if allowed is None:
+            continue
+
+        parent = _chain_parent(node.func.value.value)
+        if parent is not None and parent not in allowed:
+            violations.append(
+                f"line {node.lineno}: {HIERARCHY_ERROR}: {child} created under {parent} "
+                f"(allowed under: {', '.join(sorted(allowed))}): {ast.unparse(node)}"
+            )
+
+def _check_patterns(tree, code, violations):
+    # On normalized source so line breaks and spacing cannot hide a chain
+    seen = set()
+    texts = [code] + [ast.unparse(n) for n in ast.walk(tree) if isinstance(n, ast.Attribute)]
+    for text in texts:
+        compact = re.sub(r"\s+", "", text)
+        for pattern in INVALID_PATTERNS:
+            if pattern in compact and pattern not in seen:
+                seen.add(pattern)
+                violations.append(f"{HIERARCHY_ERROR} detected: {pattern}")
+
+def _check_conventions(tree, violations):
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call)
+                and isinstance(node.func, ast.Name)
+                and node.func.id == "print"):
+            violations.append(f"line {node.lineno}: use self.log instead of print()")
+
+        if isinstance(node, ast.Raise) and node.exc is not None:
+            exc = node.exc.func if isinstance(node.exc, ast.Call) else node.exc
+            if isinstance(exc, ast.Name) and exc.id in GENERIC_EXCEPTIONS:
+                violations.append(
+                    f"line {node.lineno}: raise IxiaOperationException / "
+                    f"IxiaConfigException instead of {exc.id}"
+                )
+
+    for node in _api_defs(tree):
+        if not ast.get_docstring(node):
+            violations.append(f"line {node.lineno}: {node.name}() has no docstring")
+
+def _api_defs(tree):
+    # Top-level functions and class methods; nested helpers need no docstring
+    for node in tree.body:
+        if isinstance(node, _FUNCS):
+            yield node
+        elif isinstance(node, ast.ClassDef):
+            yield from (child for child in node.body if isinstance(child, _FUNCS))
+
+def _existing_names():
+    entry = code_index.get_index().get(TARGET_FILE, {})
+    return {s["qualname"].rsplit(".", 1)[-1] for s in entry.get("symbols", [])}
+
+def _check_duplicates(tree, violations, existing):
+    defined = set()
+    for node in tree.body if not _is_class_wrapper(tree) else tree.body[0].body:
+        if not isinstance(node, _FUNCS):
+            continue
+        if node.name in defined:
+            violations.append(f"line {node.lineno}: {node.name}() is defined twice")
+        elif node.name in existing:
+            violations.append(
+                f"line {node.lineno}: {node.name}() already exists in {TARGET_FILE}; "
+                "do not re-generate existing APIs"
+            )
+        defined.add(node.name)
+
+def _is_class_wrapper(tree):
+    return len(tree.body) == 1 and isinstance(tree.body[0], ast.ClassDef)
+
+def hierarchy_violations(violations):
+    return [v for v in violations if HIERARCHY_ERROR in v]
+
+def validate(code: str, check_existing: bool = True, allow=()):
+    """
+    Check generated CAFY code in one pass and return every violation found
+    (an empty list means the code is acceptable): syntax, INVALID_PATTERNS,
+    Topology -> DeviceGroup -> Ethernet -> IPv4/IPv6 chaining, logging and
+    exception conventions, docstrings, and redefinitions of functions that
+    already exist in ixia_generated.py (except the names in `allow`, e.g.
+    APIs written earlier in the same cycle).
+    """
+    code = extract_code(code)
+    violations = []
+
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        violations.append(f"line {e.lineno}: SyntaxError: {e.msg}")
+        # Still report hierarchy patterns so the model fixes both at once
+        for pattern in INVALID_PATTERNS:
+            if pattern in re.sub(r"\s+", "", code):
+                violations.append(f"{HIERARCHY_ERROR} detected: {pattern}")
+        return violations
+
+    _check_patterns(tree, code, violations)
+    _check_chains(tree, violations)
+    _check_conventions(tree, violations)
+    _check_duplicates(tree, violations, _existing_names() - set(allow) if check_existing else set())
+    return violations
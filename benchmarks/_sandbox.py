@@ -0,0 +1,50 @@
+# benchmarks/_sandbox.py
+#
+# Run agent benchmarks against throw-away copies of cafy_apis/ and data/,
+# so generated code, memory writes and telemetry never touch the real tree.
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+@contextmanager
+def sandbox():
+    from agent_core import tools, code_index, telemetry
+    from memory import vector_store
+
+    saved = {
+        (tools, "BASE_API_DIR"): tools.BASE_API_DIR,
+        (code_index, "BASE_API_DIR"): code_index.BASE_API_DIR,
+        (code_index, "CODE_INDEX_PATH"): code_index.CODE_INDEX_PATH,
+        (code_index, "_index"): code_index._index,
+    }
+    for name in ("FAISS_INDEX_PATH", "FAISS_META_PATH", "LEGACY_META_JSON_PATH",
+                 "FAISS_WAL_PATH", "FAISS_LOCK_PATH"):
+        saved[(vector_store, name)] = getattr(vector_store, name)
+    for name in ("TELEMETRY_PATH", "TELEMETRY_PROM_PATH"):
+        saved[(telemetry, name)] = getattr(telemetry, name)
+
+    with tempfile.TemporaryDirectory() as root:
+        root = Path(root)
+        shutil.copytree(PROJECT_ROOT / "cafy_apis", root / "cafy_apis")
+        shutil.copytree(PROJECT_ROOT / "data", root / "data",
+                        ignore=shutil.ignore_patterns("llm_cache", "*.sock", "*.lock"))
+
+        tools.BASE_API_DIR = root / "cafy_apis"
+        code_index.BASE_API_DIR = root / "cafy_apis"
+        code_index.CODE_INDEX_PATH = root / "data" / "code_index.json"
+        code_index._index = None
+        for (module, name), value in saved.items():
+            if module in (vector_store, telemetry):
+                setattr(module, name, str(root / "data" / os.path.basename(value)))
+        vector_store.metadata_store = None
+
+        try:
+            yield root
+        finally:
+            for (module, name), value in saved.items():
+                setattr(module, name, value)
+            vector_store.metadata_store = None
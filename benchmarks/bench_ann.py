@@ -0,0 +1,114 @@
+# benchmarks/bench_ann.py
+#
+# Recall@k and query latency of the ANN and quantized index types against
+# exact search, plus the memory each quantized index takes.
+# Uses synthetic unit vectors by default, or the vectors in the memory store.
+#
+#     python -m benchmarks.bench_ann --n 100000 --k 5
+#     python -m benchmarks.bench_ann --from-store
+import argparse
+import time
+import faiss
+import numpy as np
+
+from memory import faiss_index
+
+def normalize(x):
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+def load_vectors(args):
+    if args.from_store:
+        from memory import vector_store
+        vector_store._load()
+        base = faiss_index.reconstruct_all(vector_store.index)
+    else:
+        rng = np.random.default_rng(0)
+        base = normalize(rng.standard_normal((args.n, args.dim)).astype("float32"))
+
+    rng = np.random.default_rng(1)
+    # Queries near stored vectors, like a re-asked prompt
+    picks = rng.choice(len(base), size=min(args.queries, len(base)), replace=False)
+    noise = 0.1 * rng.standard_normal((len(picks), base.shape[1])).astype("float32")
+    queries = normalize(base[picks] + noise).astype("float32")
+    return base, queries
+
+def measure(index, queries, k):
+    latencies = []
+    results = []
+    for q in queries:
+        start = time.perf_counter()
+        _, idxs = index.search(q.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - start)
+        results.append(idxs[0])
+    return np.array(results), np.array(latencies) * 1000
+
+def recall(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--from-store", action="store_true")
+    args = parser.parse_args()
+
+    base, queries = load_vectors(args)
+    dim = base.shape[1]
+    exact = faiss_index.build_index(dim, base, kind="flat_ip")
+    truth, exact_ms = measure(exact, queries, args.k)
+    print(f"{len(base)} vectors, dim={dim}, {len(queries)} queries, k={args.k}")
+    print(f"{'flat_ip':22s} recall=1.000 mean={exact_ms.mean():.3f}ms p95={np.percentile(exact_ms, 95):.3f}ms")
+
+    start = time.perf_counter()
+    hnsw = faiss_index.build_index(dim, base, kind="hnsw")
+    print(f"hnsw build: {time.perf_counter() - start:.1f}s")
+    for ef in (16, 32, 64, 128):
+        hnsw.hnsw.efSearch = ef
+        found, ms = measure(hnsw, queries, args.k)
+        print(f"{'hnsw efSearch=' + str(ef):22s} recall={recall(found, truth):.3f} "
+              f"mean={ms.mean():.3f}ms p95={np.percentile(ms, 95):.3f}ms")
+
+    # Force IVF regardless of IVF_TRAIN_THRESHOLD so small stores can be compared too
+    start = time.perf_counter()
+    quantizer = faiss.IndexFlatIP(dim)
+    ivf = faiss.IndexIVFFlat(quantizer, dim, faiss_index._nlist(len(base)), faiss.METRIC_INNER_PRODUCT)
+    ivf.train(base)
+    ivf.add(base)
+    print(f"ivf build (nlist={ivf.nlist}): {time.perf_counter() - start:.1f}s")
+    for nprobe in (1, 4, 16, 64):
+        ivf.nprobe = nprobe
+        found, ms = measure(ivf, queries, args.k)
+        print(f"{'ivf nprobe=' + str(nprobe):22s} recall={recall(found, truth):.3f} "
+              f"mean={ms.mean():.3f}ms p95={np.percentile(ms, 95):.3f}ms")
+
+    # Quantized storage: recall and memory against the float index, again
+    # regardless of the training thresholds
+    float_bytes = faiss_index.footprint(exact)
+    print(f"{'flat_ip size':22s} {float_bytes / 2**20:.1f} MiB ({float_bytes / len(base):.0f} B/vector)")
+    for kind in faiss_index.QUANTIZED_KINDS:
+        start = time.perf_counter()
+        try:
+            quantized = _forced(dim, base, kind)
+        except RuntimeError as e:
+            print(f"{kind:22s} skipped: {e}")
+            continue
+        size = faiss_index.footprint(quantized)
+        found, ms = measure(quantized, queries, args.k)
+        print(f"{kind:22s} recall={recall(found, truth):.3f} "
+              f"mean={ms.mean():.3f}ms p95={np.percentile(ms, 95):.3f}ms "
+              f"size={size / 2**20:.1f} MiB ({float_bytes / size:.1f}x smaller) "
+              f"build={time.perf_counter() - start:.1f}s")
+
+def _forced(dim, base, kind):
+    saved = faiss_index._TRAIN_THRESHOLDS[kind]
+    faiss_index._TRAIN_THRESHOLDS[kind] = 0
+    try:
+        return faiss_index.build_index(dim, base, kind=kind)
+    finally:
+        faiss_index._TRAIN_THRESHOLDS[kind] = saved
+
+if __name__ == "__main__":
+    main()
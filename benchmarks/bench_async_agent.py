@@ -0,0 +1,50 @@
+# benchmarks/bench_async_agent.py
+#
+# Agent throughput: sequential run_cycle versus the async batch driver at
+# several concurrency limits. Point it at a local stand-in endpoint so the
+# numbers measure the agent, not a remote model:
+#
+#     python -m benchmarks.llm_standin --latency-ms 300 &
+#     python -m benchmarks.bench_async_agent --api-base http://127.0.0.1:8000/v1 \
+#         --model openai/standin --requests 16 --concurrency 1 4 8
+import argparse
+import time
+
+from agent_core.agent import CAFTA_Agent
+from agent_core.batch import run_batch
+from benchmarks._sandbox import sandbox
+from benchmarks.bench_context import DEFAULT_PROMPTS
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--api-base", required=True)
+    parser.add_argument("--model", default="openai/standin")
+    parser.add_argument("--api-key", default="standin")
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    intents = [DEFAULT_PROMPTS[i % len(DEFAULT_PROMPTS)] + f" (#{i})" for i in range(args.requests)]
+
+    def make_agent():
+        # No response cache: every request must reach the endpoint
+        return CAFTA_Agent(model=args.model, use_cache=False,
+                           api_base=args.api_base, api_key=args.api_key)
+
+    with sandbox():
+        start = time.perf_counter()
+        for intent in intents:
+            make_agent().run_cycle(intent)
+        elapsed = time.perf_counter() - start
+        print(f"{'sequential run_cycle':28s} {len(intents) / elapsed:6.2f} req/s ({elapsed:.2f}s)")
+
+        for concurrency in args.concurrency:
+            start = time.perf_counter()
+            records = run_batch(intents, concurrency=concurrency, agent_factory=make_agent)
+            elapsed = time.perf_counter() - start
+            ok = sum(1 for r in records if r["status"] == "success")
+            print(f"{'arun_batch concurrency=' + str(concurrency):28s} "
+                  f"{len(intents) / elapsed:6.2f} req/s ({elapsed:.2f}s, {ok}/{len(intents)} success)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# benchmarks/bench_code_tools.py
+#
+# Tool-result tokens for reading CAFY code: the old 80k-character
+# read_code dump versus a navigation session (list, grep, read symbols).
+#
+#     python -m benchmarks.bench_code_tools
+import time
+
+from agent_core import code_index
+from agent_core.tools import read_code, list_symbols, read_symbol, grep_code
+from memory.rag import count_tokens
+
+def main():
+    start = time.perf_counter()
+    code_index.get_index()
+    print(f"code index refresh: {time.perf_counter() - start:.3f}s")
+
+    dump = read_code("ixia_multicast.py")
+
+    session = [
+        list_symbols(contains="rocev2"),
+        grep_code(r"Ipv6Loopback\.find\(\)", max_hits=10),
+        read_symbol("start_stop_rocev2_3"),
+        read_symbol("Cafy.get_rocev2_names"),
+    ]
+
+    dump_tokens = count_tokens(dump)
+    session_tokens = sum(count_tokens(result) for result in session)
+    print(f"read_code dump:     {dump_tokens:7d} tokens")
+    print(f"navigation session: {session_tokens:7d} tokens "
+          f"({dump_tokens / max(session_tokens, 1):.1f}x fewer)")
+    # Every tool message is resent on each later iteration of run_cycle
+    print("over a 6-iteration cycle the difference is paid up to 5 more times")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/bench_context.py
+#
+# Prompt tokens spent on retrieved context per request: the old top-3
+# join cut at 8000 characters versus the token-budgeted packer.
+#
+#     python -m benchmarks.bench_context
+#     python -m benchmarks.bench_context --prompts requests.jsonl
+import argparse
+import json
+import statistics
+
+from agent_core.prompts import SYSTEM_PROMPT
+from memory.rag import count_tokens, retrieve_memory
+from memory.vector_store import search
+
+DEFAULT_PROMPTS = [
+    "create an api to find rocev2 names across all device group, it can be two level "
+    "device group as well, include ipv6 and ipv6loopback with proper conditioning",
+    "Create a device group with 100 BGP routes and start traffic",
+    "add an api that returns all traffic item names and their types",
+    "create a BGP router under a device group and attach ipv4 routes",
+]
+
+def legacy_retrieve(query, k=3):
+    docs = search(query, k)
+    return "\n\n".join(doc["text"] for doc in docs)[:8000]
+
+def load_prompts(path):
+    if not path:
+        return DEFAULT_PROMPTS
+    prompts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                prompts.append(record.get("prompt") or record.get("body") or record["title"])
+    return prompts
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prompts", help="JSONL file with prompt/body fields")
+    args = parser.parse_args()
+
+    system_tokens = count_tokens(SYSTEM_PROMPT)
+    rows = []
+    for prompt in load_prompts(args.prompts):
+        before = count_tokens(legacy_retrieve(prompt))
+        after = count_tokens(retrieve_memory(prompt))
+        rows.append((before, after))
+        print(f"before={before:6d} after={after:6d}  {prompt[:60]!r}")
+
+    before = [b for b, _ in rows]
+    after = [a for _, a in rows]
+    print(f"\nsystem prompt: {system_tokens} tokens")
+    print(f"context tokens per request: before mean={statistics.mean(before):.0f} "
+          f"max={max(before)}  after mean={statistics.mean(after):.0f} max={max(after)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/bench_embedder.py
+#
+# Queries per second, peak RSS and agreement with the torch backend for
+# each EMBEDDING_BACKEND. Every backend runs in a fresh interpreter so its
+# RSS is not mixed with the others.
+#
+#     python -m benchmarks.bench_embedder --threads 4
+#     python -m benchmarks.bench_embedder --backends torch onnx --onnx-file onnx/model_qint8_avx512_vnni.onnx
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_context import DEFAULT_PROMPTS
+
+BACKENDS = ["torch", "torch_qint8", "onnx"]
+
+def _texts(n):
+    # Short prompts (queries) and longer code-like records (stores)
+    base = DEFAULT_PROMPTS + [
+        "def get_device_group_names_from_port(self, port_name=None):\n"
+        '    """Return device group names configured under the given port."""\n'
+        "    topology = self.ixNetwork.Topology.find()\n" * 4
+    ]
+    return [f"{base[i % len(base)]} #{i}" for i in range(n)]
+
+def run_backend(backend, threads, onnx_file, n, out_path):
+    import config
+    config.EMBEDDING_BACKEND = backend
+    config.EMBEDDING_THREADS = threads
+    config.EMBEDDING_ONNX_FILE = onnx_file
+    from memory import embedder
+
+    start = time.perf_counter()
+    embedder.get_embedder()
+    load_s = time.perf_counter() - start
+
+    texts = _texts(n)
+    embedder._embed_local(texts[:8])  # warm-up
+
+    # One query at a time, as search() does
+    start = time.perf_counter()
+    for text in texts:
+        embedder._embed_local([text])
+    query_qps = n / (time.perf_counter() - start)
+
+    # Batched, as store_many() does
+    start = time.perf_counter()
+    vectors = embedder._embed_local(texts)
+    batch_qps = n / (time.perf_counter() - start)
+
+    np.save(out_path, vectors)
+    rss_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({
+        "load_s": round(load_s, 2),
+        "query_qps": round(query_qps, 1),
+        "batch_qps": round(batch_qps, 1),
+        "rss_mib": round(rss_mib, 1)
+    }))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=BACKENDS)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--onnx-file", default=None)
+    parser.add_argument("--n", type=int, default=200)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_backend(args.child, args.threads, args.onnx_file, args.n, args.out)
+        return
+
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    with tempfile.TemporaryDirectory() as tmp:
+        reference = None
+        for backend in backends:
+            out_path = os.path.join(tmp, f"{backend}.npy")
+            cmd = [sys.executable, "-m", "benchmarks.bench_embedder", "--child", backend,
+                   "--threads", str(args.threads), "--n", str(args.n), "--out", out_path]
+            if args.onnx_file:
+                cmd += ["--onnx-file", args.onnx_file]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"{backend:12s} failed: {proc.stderr.strip().splitlines()[-1:]}")
+                continue
+
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            vectors = np.load(out_path)
+            if reference is None:
+                reference = vectors
+            # Embeddings are normalized: row-wise dot product is the cosine
+            cosine = np.sum(vectors * reference, axis=1)
+            print(f"{backend:12s} load={result['load_s']:5.2f}s "
+                  f"query={result['query_qps']:7.1f}/s batch={result['batch_qps']:7.1f}/s "
+                  f"rss={result['rss_mib']:7.1f} MiB "
+                  f"max|diff|={np.abs(vectors - reference).max():.4f} "
+                  f"min cos={cosine.min():.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/bench_ingest.py
+#
+# Ingestion throughput (documents per second) for the cafy_apis tree,
+# one store() per document versus a single batched store_many().
+# Runs against a throw-away data directory, never the real memory.
+#
+#     python -m benchmarks.bench_ingest --batch-size 64
+import argparse
+import os
+import tempfile
+import time
+
+from memory import vector_store
+from rag.chunker import chunk_source
+from rag.ingest import CAFY_FILES, read_file, _chunk_text
+
+def load_documents():
+    docs = []
+    for path in CAFY_FILES:
+        for chunk in chunk_source(path, read_file(path)):
+            docs.append((_chunk_text(chunk), {"type": "cafy_source", "file": path}))
+    return docs
+
+def use_fresh_store(data_dir):
+    vector_store.FAISS_INDEX_PATH = os.path.join(data_dir, "cafy.index")
+    vector_store.FAISS_META_PATH = os.path.join(data_dir, "cafy_meta.db")
+    vector_store.LEGACY_META_JSON_PATH = os.path.join(data_dir, "none.json")
+    vector_store.FAISS_WAL_PATH = os.path.join(data_dir, "cafy.wal")
+    vector_store.index = None
+    vector_store.metadata_store = None
+
+def run(label, docs, ingest):
+    with tempfile.TemporaryDirectory() as data_dir:
+        use_fresh_store(data_dir)
+        start = time.perf_counter()
+        ingest(docs)
+        vector_store.compact()
+        elapsed = time.perf_counter() - start
+    print(f"{label:30s} {len(docs)} docs in {elapsed:.2f}s = {len(docs) / elapsed:.1f} docs/s")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--limit", type=int, default=0, help="only use the first N documents")
+    args = parser.parse_args()
+
+    docs = load_documents()
+    if args.limit:
+        docs = docs[:args.limit]
+
+    # Warm the model so neither run pays the load cost
+    vector_store._embed(["warmup"])
+
+    run("store() per document", docs, lambda d: [vector_store.store(t, m) for t, m in d])
+    run(
+        f"store_many(batch_size={args.batch_size})",
+        docs,
+        lambda d: vector_store.store_many(
+            [t for t, _ in d], [m for _, m in d], batch_size=args.batch_size
+        )
+    )
+
+if __name__ == "__main__":
+    main()
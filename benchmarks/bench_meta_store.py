@@ -0,0 +1,81 @@
+# benchmarks/bench_meta_store.py
+#
+# Load time and peak RSS of the metadata store at scale: the old
+# cafy_meta.json array versus the SQLite MetaStore. Each measurement runs
+# in a fresh interpreter so peak RSS is not shared.
+#
+#     python -m benchmarks.bench_meta_store --records 100000
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import uuid
+
+from memory.meta_store import MetaStore
+
+LOAD_JSON = """
+import json, resource, time
+start = time.perf_counter()
+with open({path!r}, "r", encoding="utf-8") as f:
+    records = json.load(f)
+texts = [records[i]["text"] for i in range(0, len(records), 1000)]
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+LOAD_SQLITE = """
+import resource, time
+from memory.meta_store import MetaStore
+start = time.perf_counter()
+store = MetaStore({path!r})
+headers = store.load_headers()
+texts = store.texts(range(0, len(headers), 1000))
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def make_records(n, text_size):
+    body = "x" * text_size
+    for i in range(n):
+        yield {
+            "id": str(uuid.uuid4()),
+            "text": f"Q:\nrecord {i}\n\nA:\n{body}",
+            "metadata": {"type": "validated_generation", "confidence": "medium", "source": "agent"}
+        }
+
+def run(snippet):
+    out = subprocess.run(
+        [sys.executable, "-c", snippet], check=True, capture_output=True, text=True
+    ).stdout.split()
+    seconds, max_rss_kb = float(out[0]), int(out[1])
+    return seconds, max_rss_kb / 1024
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--text-size", type=int, default=4000, help="characters per record")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        json_path = os.path.join(data_dir, "cafy_meta.json")
+        db_path = os.path.join(data_dir, "cafy_meta.db")
+
+        records = list(make_records(args.records, args.text_size))
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=2)
+        store = MetaStore(db_path)
+        store.write(enumerate(records))
+        store.close()
+        del records
+
+        print(f"{args.records} records, {args.text_size} chars each")
+        for label, path, snippet in (
+            ("json", json_path, LOAD_JSON),
+            ("sqlite", db_path, LOAD_SQLITE),
+        ):
+            seconds, rss_mb = run(snippet.format(path=path))
+            size_mb = os.path.getsize(path) / 2**20
+            print(f"{label:8s} file={size_mb:8.1f}MB load={seconds:6.2f}s peak_rss={rss_mb:8.1f}MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# benchmarks/bench_replay.py
+#
+# Offline agent-loop benchmark: every transcript is replayed through
+# CAFTA_Agent.run_cycle against the in-process LLM stand-in, in a sandbox.
+# Reports convergence, iterations, retries, cycle latency and the agent's
+# own overhead (cycle time not spent waiting for the model) as JSON.
+#
+#     python -m benchmarks.bench_replay --runs 5 --latency-ms 200 --fail-rate 0.05
+#     python -m benchmarks.bench_replay --stream --chunk-ms 5 --out replay.json
+#     python -m benchmarks.bench_replay --baseline replay.json   # exit 1 on regression
+import argparse
+import json
+import statistics
+import sys
+from pathlib import Path
+
+from agent_core import tools
+from agent_core.agent import CAFTA_Agent
+from benchmarks import llm_standin
+from benchmarks._sandbox import sandbox
+
+DEFAULT_TRANSCRIPTS = Path(__file__).resolve().parent / "transcripts"
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))], 2)
+
+def _distribution(values):
+    return {"p50": _percentile(values, 50), "p95": _percentile(values, 95),
+            "mean": round(statistics.mean(values), 2) if values else 0.0}
+
+def replay(intents, url, runs, stream, max_iterations):
+    rows = []
+    with sandbox():
+        target = tools.BASE_API_DIR / "ixia_generated.py"
+        original = target.read_text(encoding="utf-8")
+
+        for _ in range(runs):
+            for intent in intents:
+                # Every cycle starts from the same file, so an API written
+                # in one run is not a duplicate in the next
+                target.write_text(original, encoding="utf-8")
+
+                agent = CAFTA_Agent(model="openai/standin", api_base=url, api_key="standin",
+                                    use_cache=False, stream=stream, max_iterations=max_iterations)
+                try:
+                    result = agent.run_cycle(intent)
+                    status = "success" if result.startswith("SUCCESS") else "not_converged"
+                except Exception as e:
+                    status = "error"
+                    result = f"ERROR: {e}"
+
+                record = agent.trace.record
+                if "totals" not in record:
+                    # Failed before the model loop (e.g. retrieval)
+                    record = agent.trace.finish(status)
+                totals = record["totals"]
+                cycle_ms = record["duration_s"] * 1000
+                llm_ms = totals["spans"].get("llm", 0.0) * 1000
+                rows.append({
+                    "intent": intent,
+                    "status": status,
+                    "result": result[:200],
+                    "iterations": totals["iterations"],
+                    "retries": totals["retries"],
+                    "cycle_ms": cycle_ms,
+                    "llm_ms": llm_ms,
+                    "overhead_ms": cycle_ms - llm_ms,
+                    "spans_ms": {step: s * 1000 for step, s in totals["spans"].items()}
+                })
+    return rows
+
+def summarize(rows):
+    statuses, retries, steps = {}, {}, {}
+    for row in rows:
+        statuses[row["status"]] = statuses.get(row["status"], 0) + 1
+        for reason, n in row["retries"].items():
+            retries[reason] = retries.get(reason, 0) + n
+        for step, ms in row["spans_ms"].items():
+            steps.setdefault(step, []).append(ms)
+
+    return {
+        "cycles": len(rows),
+        "convergence": round(statuses.get("success", 0) / len(rows), 4) if rows else 0.0,
+        "status": statuses,
+        "iterations_mean": round(statistics.mean(r["iterations"] for r in rows), 2) if rows else 0.0,
+        "retries": retries,
+        "cycle_ms": _distribution([r["cycle_ms"] for r in rows]),
+        "llm_ms": _distribution([r["llm_ms"] for r in rows]),
+        "overhead_ms": _distribution([r["overhead_ms"] for r in rows]),
+        "steps_ms": {step: _distribution(values) for step, values in sorted(steps.items())}
+    }
+
+def compare(report, baseline, max_convergence_drop, max_overhead_ratio):
+    failures = []
+    if report["convergence"] < baseline["convergence"] - max_convergence_drop:
+        failures.append(f"convergence {baseline['convergence']} -> {report['convergence']}")
+    if report["iterations_mean"] > baseline["iterations_mean"] + 0.5:
+        failures.append(f"iterations {baseline['iterations_mean']} -> {report['iterations_mean']}")
+    previous = baseline["overhead_ms"]["p95"]
+    if previous and report["overhead_ms"]["p95"] > previous * max_overhead_ratio:
+        failures.append(f"overhead p95 {previous}ms -> {report['overhead_ms']['p95']}ms")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transcripts", default=str(DEFAULT_TRANSCRIPTS))
+    parser.add_argument("--runs", type=int, default=3, help="replays of every transcript")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--max-iterations", type=int, default=6)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--chunk-ms", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--fail-status", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="also write the JSON report here")
+    parser.add_argument("--baseline", help="report to compare against; exit 1 on regression")
+    parser.add_argument("--max-convergence-drop", type=float, default=0.0)
+    parser.add_argument("--max-overhead-ratio", type=float, default=1.5)
+    parser.add_argument("--verbose", action="store_true", help="include every cycle in the report")
+    args = parser.parse_args()
+
+    transcripts = llm_standin.load_transcripts(args.transcripts)
+    state = llm_standin.StandinState(
+        transcripts, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        chunk_ms=args.chunk_ms, fail_rate=args.fail_rate, fail_status=args.fail_status,
+        seed=args.seed
+    )
+    server = llm_standin.start(state)
+    try:
+        rows = replay(list(transcripts), server.url, args.runs, args.stream, args.max_iterations)
+    finally:
+        server.shutdown()
+
+    report = summarize(rows)
+    report["standin"] = {k: v for k, v in state.stats.items() if k != "turns"}
+    if args.verbose:
+        report["cycles_detail"] = rows
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f),
+                                            args.max_convergence_drop, args.max_overhead_ratio)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    if args.baseline and report["regressions"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_rerank.py
+#
+# Precision@k and added latency of cross-encoder re-ranking over the
+# bi-encoder candidates. Queries are the first docstring line of every
+# ingested cafy_source method; the relevant record is that method's chunk.
+#
+#     python -m benchmarks.bench_rerank --candidates 20 --k 3
+import argparse
+import time
+
+import numpy as np
+
+from config import RERANK_BUDGET_MS
+from memory import rerank
+from memory.vector_store import list_records, search
+
+def golden_queries():
+    queries, seen = [], set()
+    for record in list_records({"type": "cafy_source"}):
+        docstring = (record["metadata"].get("docstring") or "").strip()
+        if not docstring:
+            continue
+        query = docstring.splitlines()[0].strip()
+        if query and query not in seen:
+            seen.add(query)
+            queries.append((query, record["id"]))
+    return queries
+
+def score(rankings, k):
+    precision, first, mrr = [], [], []
+    for ids, relevant in rankings:
+        top = ids[:k]
+        precision.append((relevant in top) / k)
+        first.append(bool(ids) and ids[0] == relevant)
+        rank = ids.index(relevant) + 1 if relevant in ids else None
+        mrr.append(1.0 / rank if rank else 0.0)
+    return np.mean(first), np.mean(precision), np.mean(mrr)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    queries = golden_queries()
+    print(f"{len(queries)} queries with a known relevant method")
+
+    base, reranked, cold_ms, warm_ms = [], [], [], []
+    rerank.get_reranker()  # model load is not part of the added latency
+    rerank.clear()
+    for query, relevant in queries:
+        docs = search(query, args.candidates, where={"type": "cafy_source"})
+        base.append(([d["id"] for d in docs], relevant))
+
+        start = time.perf_counter()
+        ranked = rerank.rerank(query, docs, budget_ms=float("inf"))
+        cold_ms.append((time.perf_counter() - start) * 1000)
+        reranked.append(([d["id"] for d in ranked], relevant))
+
+        start = time.perf_counter()
+        rerank.rerank(query, docs, budget_ms=float("inf"))
+        warm_ms.append((time.perf_counter() - start) * 1000)
+
+    for name, rankings in (("bi-encoder", base), ("re-ranked", reranked)):
+        p1, pk, mrr = score(rankings, args.k)
+        print(f"{name:10s}  P@1 {p1:.3f}  P@{args.k} {pk:.3f}  MRR {mrr:.3f}")
+
+    print(f"added latency, cold cache: p50 {np.percentile(cold_ms, 50):.1f} ms  "
+          f"p95 {np.percentile(cold_ms, 95):.1f} ms")
+    print(f"added latency, warm cache: p50 {np.percentile(warm_ms, 50):.2f} ms  "
+          f"p95 {np.percentile(warm_ms, 95):.2f} ms")
+
+    # Share of cold queries that would fall back under the configured budget
+    over = sum(ms > RERANK_BUDGET_MS for ms in cold_ms)
+    print(f"over RERANK_BUDGET_MS ({RERANK_BUDGET_MS} ms) when cold: {over}/{len(cold_ms)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# benchmarks/bench_retrieval.py
+#
+# Retrieval quality and latency of the memory module against a golden set
+# of intents with known relevant records. Prints one JSON document, so a
+# run can be stored as a baseline and later runs gated against it.
+#
+#     python -m benchmarks.bench_retrieval seed        # (re)write the golden set
+#     python -m benchmarks.bench_retrieval run --out retrieval.json
+#     python -m benchmarks.bench_retrieval run --baseline retrieval.json
+#
+# Golden set (benchmarks/golden_retrieval.jsonl), one intent per line:
+#   {"intent": ..., "where": {"type": ...}, "expected": [{...}, ...], "source": ...}
+# A result is relevant if it matches any expected entry: "id" is compared
+# with the record id, every other key with the record metadata.
+import argparse
+import json
+import os
+import re
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+GOLDEN_PATH = PROJECT_ROOT / "benchmarks" / "golden_retrieval.jsonl"
+META_JSON_PATH = PROJECT_ROOT / "data" / "cafy_meta.json"
+
+# The files rag.ingest indexes as cafy_source
+CAFY_FILES = [
+    "cafy_apis/ixia_generated.py",
+    "cafy_apis/ixia_multicast.py",
+]
+
+MEMORY_TYPES = ["correction", "validated_generation"]
+K_VALUES = [1, 3, 5, 10]
+
+# ---------------------------
+# Golden set
+# ---------------------------
+def _question(text):
+    # "Q:\n<request>\n\nWHAT WAS WRONG: ..." / "Q:\n<request>\n\nA:\n<code>"
+    match = re.match(r"\s*Q:\s*(.*?)(?:\n\s*WHAT WAS WRONG:|\n\s*A:)", text, re.DOTALL)
+    return " ".join(match.group(1).split()) if match else None
+
+def _memory_entries():
+    # Stored requests that should bring back their own answers/corrections.
+    # Records asked with the same request are all relevant for it.
+    with open(META_JSON_PATH, "r", encoding="utf-8") as f:
+        records = json.load(f)
+
+    by_intent = {}
+    for record in records:
+        if record["metadata"].get("type") not in MEMORY_TYPES:
+            continue
+        intent = _question(record["text"])
+        if intent:
+            by_intent.setdefault(intent, []).append({"id": record["id"]})
+
+    return [
+        {"intent": intent, "where": {"type": MEMORY_TYPES}, "expected": expected, "source": "cafy_meta"}
+        for intent, expected in by_intent.items()
+    ]
+
+def _method_intent(chunk):
+    # First docstring sentence, else the method name as words
+    summary = chunk["docstring"].strip().split("\n\n")[0]
+    summary = " ".join(summary.split())
+    if len(summary) >= 15:
+        return summary, "docstring"
+    name = chunk["qualname"].rsplit(".", 1)[-1].strip("_")
+    return name.replace("_", " "), "method_name"
+
+def _method_entries():
+    from rag.chunker import chunk_source
+
+    entries, seen = [], set()
+    for path in CAFY_FILES:
+        source = (PROJECT_ROOT / path).read_text(encoding="utf-8")
+        for chunk in chunk_source(path, source):
+            if chunk["kind"] != "method":
+                continue
+            intent, origin = _method_intent(chunk)
+            if intent in seen:
+                # Copy-pasted docstrings: not answerable by any retriever
+                continue
+            seen.add(intent)
+            entries.append({
+                "intent": intent,
+                "where": {"type": "cafy_source"},
+                "expected": [{"file": path, "qualname": chunk["qualname"]}],
+                "source": origin
+            })
+    return entries
+
+def seed(path=GOLDEN_PATH):
+    entries = _memory_entries() + _method_entries()
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+    return entries
+
+def load_golden(path=GOLDEN_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+# ---------------------------
+# Metrics
+# ---------------------------
+def _relevant(result, expected):
+    for entry in expected:
+        if all(
+            (result["id"] == value) if key == "id" else (result["metadata"].get(key) == value)
+            for key, value in entry.items()
+        ):
+            return True
+    return False
+
+def _rss_mib():
+    # Current resident set (Linux); peak RSS is reported separately
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return None
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))], 3)
+
+def run(golden, k_max=max(K_VALUES)):
+    from memory import vector_store, query_cache
+    from memory.embedder import get_embedder
+
+    # Model load is not part of index load or query latency
+    get_embedder()
+    rss_before = _rss_mib()
+
+    start = time.perf_counter()
+    vector_store._load()
+    load_s = time.perf_counter() - start
+    rss_after = _rss_mib()
+
+    query_cache.clear()
+    per_query = []
+    for entry in golden:
+        start = time.perf_counter()
+        results = vector_store.search(entry["intent"], k_max, where=entry["where"])
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        flags = [_relevant(r, entry["expected"]) for r in results]
+        first = flags.index(True) + 1 if True in flags else None
+        per_query.append({
+            "source": entry["source"],
+            "latency_ms": latency_ms,
+            "rr": 1.0 / first if first else 0.0,
+            # Capped: with several equally relevant records, finding k of
+            # them in the top k is full recall
+            "recall": {
+                k: sum(flags[:k]) / min(k, len(entry["expected"])) for k in K_VALUES
+            }
+        })
+
+    def summarize(rows):
+        latencies = [r["latency_ms"] for r in rows]
+        return {
+            "queries": len(rows),
+            **{f"recall@{k}": round(statistics.mean(r["recall"][k] for r in rows), 4) for k in K_VALUES},
+            "mrr": round(statistics.mean(r["rr"] for r in rows), 4),
+            "latency_ms": {
+                "p50": _percentile(latencies, 50),
+                "p95": _percentile(latencies, 95),
+                "mean": round(statistics.mean(latencies), 3)
+            }
+        }
+
+    report = {
+        "index": {
+            "vectors": vector_store._indexed_rows(),
+            "load_s": round(load_s, 3),
+            "rss_delta_mib": round(rss_after - rss_before, 1) if rss_before is not None else None
+        },
+        "peak_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "overall": summarize(per_query),
+        "by_source": {
+            source: summarize([r for r in per_query if r["source"] == source])
+            for source in sorted({r["source"] for r in per_query})
+        }
+    }
+    return report
+
+# ---------------------------
+# Regression gate
+# ---------------------------
+def compare(report, baseline, max_quality_drop, max_latency_ratio):
+    failures = []
+    current, previous = report["overall"], baseline["overall"]
+    for key in [f"recall@{k}" for k in K_VALUES] + ["mrr"]:
+        if current[key] < previous[key] - max_quality_drop:
+            failures.append(f"{key} {previous[key]} -> {current[key]}")
+    p95, previous_p95 = current["latency_ms"]["p95"], previous["latency_ms"]["p95"]
+    if previous_p95 and p95 > previous_p95 * max_latency_ratio:
+        failures.append(f"p95 latency {previous_p95}ms -> {p95}ms")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["seed", "run"])
+    parser.add_argument("--golden", default=str(GOLDEN_PATH))
+    parser.add_argument("--out", help="also write the JSON report here")
+    parser.add_argument("--baseline", help="report to compare against; exit 1 on regression")
+    parser.add_argument("--max-quality-drop", type=float, default=0.02)
+    parser.add_argument("--max-latency-ratio", type=float, default=1.5)
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        entries = seed(args.golden)
+        counts = {}
+        for entry in entries:
+            counts[entry["source"]] = counts.get(entry["source"], 0) + 1
+        print(f"{len(entries)} intents -> {args.golden} {counts}")
+        return
+
+    report = run(load_golden(args.golden))
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            failures = compare(report, json.load(f), args.max_quality_drop, args.max_latency_ratio)
+        report["regressions"] = failures
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    if args.baseline and report["regressions"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# benchmarks/bench_startup.py
+#
+# Cold start-up cost of the memory layer, each sample in a fresh interpreter.
+#
+#     python -m benchmarks.bench_startup --runs 5
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+SCENARIOS = {
+    # What every `python run_agent.py` paid before: import + model load
+    "eager (import + model load)": (
+        "import memory.vector_store; "
+        "from memory.embedder import get_embedder; get_embedder()"
+    ),
+    # What importing costs now that the model is loaded on first use
+    "lazy (import only)": "import memory.vector_store",
+    "lazy (import agent_core.agent)": "import agent_core.agent",
+}
+
+def time_snippet(snippet, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", snippet], check=True)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, snippet in SCENARIOS.items():
+        samples = time_snippet(snippet, args.runs)
+        print(
+            f"{name:35s} median={statistics.median(samples):.3f}s "
+            f"min={min(samples):.3f}s max={max(samples):.3f}s"
+        )
+
+if __name__ == "__main__":
+    main()
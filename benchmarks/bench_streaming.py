@@ -0,0 +1,47 @@
+# benchmarks/bench_streaming.py
+#
+# Time to first valid answer with and without streaming early-abort.
+# Meant for a local stand-in endpoint whose first answer contains an
+# invalid hierarchy (e.g. Vport.find().DeviceGroup) late in the code:
+#
+#     python -m benchmarks.llm_standin --chunk-ms 20 &
+#     python -m benchmarks.bench_streaming --api-base http://127.0.0.1:8000/v1 \
+#         --model openai/standin --runs 5
+import argparse
+import statistics
+import time
+
+from agent_core.agent import CAFTA_Agent
+from benchmarks._sandbox import sandbox
+from benchmarks.bench_context import DEFAULT_PROMPTS
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--api-base", required=True)
+    parser.add_argument("--model", default="openai/standin")
+    parser.add_argument("--api-key", default="standin")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with sandbox():
+        for stream in (False, True):
+            latencies, aborted, rejected, iterations = [], 0, 0, []
+            for i in range(args.runs):
+                agent = CAFTA_Agent(model=args.model, use_cache=False, stream=stream,
+                                    api_base=args.api_base, api_key=args.api_key)
+                start = time.perf_counter()
+                result = agent.run_cycle(DEFAULT_PROMPTS[i % len(DEFAULT_PROMPTS)])
+                latencies.append(time.perf_counter() - start)
+                # Streaming aborts the invalid answer mid-stream; without it
+                # the finished answer is rejected and sent back for a retry
+                aborted += agent.stats["aborted_streams"]
+                rejected += agent.stats["rejected"]
+                iterations.append(agent.stats["iterations"])
+                print(f"stream={stream!s:5s} run={i} {latencies[-1]:.2f}s {result[:60]}")
+
+            print(f"stream={stream!s:5s} median={statistics.median(latencies):.2f}s "
+                  f"mean iterations={statistics.mean(iterations):.1f} aborted streams={aborted} "
+                  f"rejected answers={rejected}\n")
+
+if __name__ == "__main__":
+    main()
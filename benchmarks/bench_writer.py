@@ -0,0 +1,67 @@
+# benchmarks/bench_writer.py
+#
+# Growth of ixia_generated.py when the same APIs are generated again and
+# again: the old blind append (twice per write_code call on the tool path)
+# versus the symbol-aware writer. Re-ingest cost is the number of chunks
+# rag.ingest would embed for the file.
+#
+#     python -m benchmarks.bench_writer --cycles 50
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from agent_core import tools
+from rag.chunker import chunk_source
+
+def _api(i, variant):
+    return (
+        f"    def generated_api_{i}(self, name=None):\n"
+        f'        """Generated API {i} (revision {variant})."""\n'
+        f"        self.log.info('generated_api_{i}')\n"
+        f"        return self.ixNetwork.Topology.find(Name=name)\n"
+    )
+
+def _legacy_append(path, code):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n\n" + code.strip() + "\n")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cycles", type=int, default=50)
+    parser.add_argument("--apis", type=int, default=10, help="distinct APIs generated")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    writes = [(rng.randrange(args.apis), rng.randrange(3)) for _ in range(args.cycles)]
+
+    original = (tools.BASE_API_DIR / "ixia_generated.py").read_text(encoding="utf-8")
+    saved = tools.BASE_API_DIR
+
+    with tempfile.TemporaryDirectory() as root:
+        tools.BASE_API_DIR = Path(root)
+        path = Path(root) / "ixia_generated.py"
+
+        for name in ("append", "symbol"):
+            path.write_text(original, encoding="utf-8")
+            start = time.perf_counter()
+            for i, variant in writes:
+                code = _api(i, variant)
+                if name == "append":
+                    # write_code inside the try, then again unconditionally
+                    _legacy_append(path, "    " + code.strip())
+                    _legacy_append(path, "    " + code.strip())
+                else:
+                    tools.write_code("ixia_generated.py", code)
+            elapsed = time.perf_counter() - start
+
+            source = path.read_text(encoding="utf-8")
+            chunks = chunk_source("ixia_generated.py", source)
+            print(f"{name:7s} {len(source):8d} bytes  {len(chunks):4d} chunks to re-ingest  "
+                  f"{elapsed * 1000 / args.cycles:6.2f} ms/write")
+
+    tools.BASE_API_DIR = saved
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+# benchmarks/llm_standin.py
+#
+# Local OpenAI-compatible stand-in for the model endpoint. It replays
+# recorded transcripts (assistant turns, including tool calls) so the
+# agent loop can be benchmarked and regression-tested offline:
+#
+#     python -m benchmarks.llm_standin --transcripts benchmarks/transcripts \
+#         --latency-ms 300 --jitter-ms 100 --fail-rate 0.05
+#
+# and point the agent at it through the usual arguments:
+#
+#     CAFTA_Agent(model="openai/standin", api_base="http://127.0.0.1:8000/v1",
+#                 api_key="standin", use_cache=False)
+#
+# Transcript files are JSONL, one assistant turn per line:
+#   {"intent": <first user message>, "turn": 0,
+#    "message": {"content": ..., "tool_calls": [{"name": ..., "arguments": {...}}]}}
+# The turn to replay is the number of assistant messages already in the
+# request, so the server keeps no per-conversation state. Past the last
+# turn the last one is repeated.
+#
+# With --upstream the stand-in forwards every request to a real
+# OpenAI-compatible endpoint instead and records the answers with --record,
+# producing transcripts in the same format.
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# ---------------------------
+# Transcripts
+# ---------------------------
+def load_transcripts(path):
+    # A JSONL file or a directory of them -> {intent: [message, ...]}
+    path = Path(path)
+    files = sorted(path.glob("*.jsonl")) if path.is_dir() else [path]
+    turns = {}
+    for file in files:
+        with open(file, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    turns.setdefault(record["intent"], {})[record["turn"]] = record["message"]
+    return {intent: [by_turn[t] for t in sorted(by_turn)] for intent, by_turn in turns.items()}
+
+def _intent(messages):
+    for message in messages:
+        if message.get("role") == "user":
+            return message.get("content") or ""
+    return ""
+
+def _turn(messages):
+    return sum(1 for message in messages if message.get("role") == "assistant")
+
+def _approx_tokens(text):
+    return len(text or "") // 4 + 1
+
+# ---------------------------
+# OpenAI response shapes
+# ---------------------------
+def _tool_calls(message, turn):
+    calls = []
+    for i, call in enumerate(message.get("tool_calls") or []):
+        arguments = call["arguments"]
+        calls.append({
+            "id": f"call_{turn}_{i}",
+            "type": "function",
+            "function": {
+                "name": call["name"],
+                "arguments": arguments if isinstance(arguments, str) else json.dumps(arguments)
+            }
+        })
+    return calls
+
+def _usage(request_messages, message, calls):
+    prompt = sum(_approx_tokens(m.get("content")) for m in request_messages)
+    completion = _approx_tokens(message.get("content")) + sum(
+        _approx_tokens(c["function"]["arguments"]) for c in calls
+    )
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+def completion_body(model, request_messages, message, turn):
+    calls = _tool_calls(message, turn)
+    reply = {"role": "assistant", "content": message.get("content")}
+    if calls:
+        reply["tool_calls"] = calls
+    return {
+        "id": f"chatcmpl-standin-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": reply,
+            "finish_reason": "tool_calls" if calls else "stop"
+        }],
+        "usage": _usage(request_messages, message, calls)
+    }
+
+def stream_chunks(model, request_messages, message, turn, chunk_chars, include_usage):
+    base = {
+        "id": f"chatcmpl-standin-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model
+    }
+
+    def chunk(delta, finish_reason=None):
+        return dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": finish_reason}])
+
+    yield chunk({"role": "assistant", "content": ""})
+
+    content = message.get("content") or ""
+    for start in range(0, len(content), chunk_chars):
+        yield chunk({"content": content[start:start + chunk_chars]})
+
+    calls = _tool_calls(message, turn)
+    for i, call in enumerate(calls):
+        arguments = call["function"]["arguments"]
+        yield chunk({"tool_calls": [{
+            "index": i, "id": call["id"], "type": "function",
+            "function": {"name": call["function"]["name"], "arguments": ""}
+        }]})
+        for start in range(0, len(arguments), chunk_chars):
+            yield chunk({"tool_calls": [{
+                "index": i, "function": {"arguments": arguments[start:start + chunk_chars]}
+            }]})
+
+    yield chunk({}, "tool_calls" if calls else "stop")
+    if include_usage:
+        yield dict(base, choices=[], usage=_usage(request_messages, message, calls))
+
+# ---------------------------
+# Server
+# ---------------------------
+class StandinState:
+    def __init__(self, transcripts, latency_ms=0, jitter_ms=0, chunk_ms=0, chunk_chars=40,
+                 fail_rate=0.0, fail_status=500, seed=0, upstream=None, upstream_key=None,
+                 record_path=None):
+        self.transcripts = transcripts
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.chunk_ms = chunk_ms
+        self.chunk_chars = chunk_chars
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.upstream = upstream
+        self.upstream_key = upstream_key
+        self.record_path = record_path
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+        self.stats = {"requests": 0, "failures": 0, "streamed": 0, "unmatched": 0, "turns": {}}
+
+    def pick(self, messages):
+        intent = _intent(messages)
+        message_list = self.transcripts.get(intent)
+        if message_list is None:
+            # e.g. benchmark prompts with a "(#3)" suffix: longest recorded
+            # intent the request starts with, else the first transcript
+            prefixes = [i for i in self.transcripts if intent.startswith(i)]
+            if prefixes:
+                intent = max(prefixes, key=len)
+            else:
+                with self.lock:
+                    self.stats["unmatched"] += 1
+                intent = next(iter(self.transcripts))
+            message_list = self.transcripts[intent]
+        turn = _turn(messages)
+        return intent, turn, message_list[min(turn, len(message_list) - 1)]
+
+    def delay(self):
+        with self.lock:
+            jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+            fail = self.rng.random() < self.fail_rate
+        time.sleep(max(0.0, self.latency_ms + jitter) / 1000)
+        return fail
+
+    def forward(self, body):
+        request = urllib.request.Request(
+            self.upstream.rstrip("/") + "/chat/completions",
+            data=json.dumps(dict(body, stream=False)).encode("utf-8"),
+            headers={"Content-Type": "application/json",
+                     "Authorization": f"Bearer {self.upstream_key or ''}"}
+        )
+        with urllib.request.urlopen(request, timeout=600) as response:
+            answer = json.loads(response.read())
+
+        message = answer["choices"][0]["message"]
+        recorded = {"content": message.get("content")}
+        if message.get("tool_calls"):
+            recorded["tool_calls"] = [
+                {"name": c["function"]["name"], "arguments": json.loads(c["function"]["arguments"] or "{}")}
+                for c in message["tool_calls"]
+            ]
+        if self.record_path:
+            line = json.dumps({"intent": _intent(body["messages"]), "turn": _turn(body["messages"]),
+                               "message": recorded})
+            with self.lock, open(self.record_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        return recorded
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        state = self.server.state
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "standin", "object": "model"}]})
+        elif self.path.rstrip("/").endswith("/stats"):
+            with state.lock:
+                self._send_json(200, state.stats)
+        else:
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+    def do_POST(self):
+        state = self.server.state
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        messages = body.get("messages", [])
+        model = body.get("model", "standin")
+        stream = bool(body.get("stream"))
+
+        with state.lock:
+            state.stats["requests"] += 1
+
+        if state.delay():
+            with state.lock:
+                state.stats["failures"] += 1
+            self._send_json(state.fail_status, {"error": {
+                "message": "stand-in injected failure", "type": "server_error"
+            }})
+            return
+
+        if state.upstream:
+            turn = _turn(messages)
+            message = state.forward(body)
+        else:
+            intent, turn, message = state.pick(messages)
+            with state.lock:
+                key = f"{intent[:60]}#{turn}"
+                state.stats["turns"][key] = state.stats["turns"].get(key, 0) + 1
+
+        if not stream:
+            self._send_json(200, completion_body(model, messages, message, turn))
+            return
+
+        with state.lock:
+            state.stats["streamed"] += 1
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            for chunk in stream_chunks(model, messages, message, turn, state.chunk_chars, include_usage):
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                if state.chunk_ms:
+                    time.sleep(state.chunk_ms / 1000)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client aborted the stream (early-abort on an invalid pattern)
+            pass
+        self.close_connection = True
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, state):
+        super().__init__(address, StandinHandler)
+        self.state = state
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+def start(state, host="127.0.0.1", port=0):
+    # Serve from a background thread (port 0 = any free port); returns the server
+    server = StandinServer((host, port), state)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transcripts", default=str(Path(__file__).resolve().parent / "transcripts"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="per request, before answering")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--chunk-ms", type=float, default=0.0, help="between streamed chunks")
+    parser.add_argument("--chunk-chars", type=int, default=40)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of requests that fail")
+    parser.add_argument("--fail-status", type=int, default=500, help="e.g. 429 or 503")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--upstream", help="forward to this OpenAI-compatible base URL instead")
+    parser.add_argument("--upstream-key", default=os.environ.get("STANDIN_UPSTREAM_KEY"))
+    parser.add_argument("--record", help="with --upstream: append transcript turns here")
+    args = parser.parse_args()
+
+    transcripts = {} if args.upstream else load_transcripts(args.transcripts)
+    if not args.upstream and not transcripts:
+        parser.error(f"no transcripts in {args.transcripts}")
+
+    state = StandinState(
+        transcripts, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        chunk_ms=args.chunk_ms, chunk_chars=args.chunk_chars, fail_rate=args.fail_rate,
+        fail_status=args.fail_status, seed=args.seed, upstream=args.upstream,
+        upstream_key=args.upstream_key, record_path=args.record
+    )
+    server = StandinServer((args.host, args.port), state)
+    print(f"LLM stand-in on {server.url} ({len(transcripts)} transcripts)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# benchmarks/stress_writers.py
+#
+# Many processes storing into one memory at the same time, with frequent
+# compactions, then a check that every record survived exactly once.
+# Reader processes search throughout and check, after every search, that
+# each index row they hold is the vector of its record's text (a load
+# racing a compaction would tie records to the wrong rows).
+# Uses a throw-away data directory and a hash-based stand-in embedder, so
+# no model is loaded.
+#
+#     python -m benchmarks.stress_writers --workers 8 --records 200
+#     python -m benchmarks.stress_writers --readers 4 --readonly-readers
+import argparse
+import hashlib
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+DIM = 384
+
+def fake_embed(texts, batch_size=None):
+    vectors = []
+    for text in texts:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vec = np.random.default_rng(seed).standard_normal(DIM).astype("float32")
+        vectors.append(vec / np.linalg.norm(vec))
+    return np.vstack(vectors)
+
+def use_store(data_dir, compact_every):
+    from memory import vector_store
+    vector_store.FAISS_INDEX_PATH = os.path.join(data_dir, "cafy.index")
+    vector_store.FAISS_META_PATH = os.path.join(data_dir, "cafy_meta.db")
+    vector_store.FAISS_WAL_PATH = os.path.join(data_dir, "cafy.wal")
+    vector_store.FAISS_LOCK_PATH = os.path.join(data_dir, "cafy.lock")
+    vector_store.LEGACY_META_JSON_PATH = os.path.join(data_dir, "none.json")
+    vector_store.WAL_COMPACT_EVERY = compact_every
+    vector_store.DEDUP_POLICY = "off"
+    vector_store._embed = fake_embed
+    return vector_store
+
+def writer(worker_id, data_dir, records, batch, compact_every):
+    vector_store = use_store(data_dir, compact_every)
+    for start in range(0, records, batch):
+        texts = [f"worker={worker_id} record={i}" for i in range(start, min(start + batch, records))]
+        vector_store.store_many(texts, [{"type": "validated_generation", "worker": worker_id}] * len(texts))
+
+def reader(reader_id, data_dir, compact_every, readonly, stop, checks):
+    vector_store = use_store(data_dir, compact_every)
+    vector_store.VECTOR_STORE_READONLY = readonly
+    vector_store.embed_query = lambda query: fake_embed([query])
+    rng = np.random.default_rng(reader_id)
+
+    while not stop.is_set():
+        vector_store.search(f"worker=0 record={int(rng.integers(100))}", 5)
+        with vector_store._state_lock:
+            rows = len(vector_store.metadata_store)
+            if vector_store._indexed_rows() != rows:
+                sys.exit(f"reader {reader_id}: {vector_store._indexed_rows()} index rows, {rows} records")
+            if not rows:
+                continue
+            positions = sorted(set(rng.integers(rows, size=min(rows, 20)).tolist()))
+            texts = vector_store._texts(positions)
+            for pos, vector in zip(positions, vector_store._vectors(positions)):
+                if float(vector @ fake_embed([texts[pos]])[0]) < 0.99:
+                    sys.exit(f"reader {reader_id}: row {pos} does not hold the vector of its text")
+        with checks.get_lock():
+            checks.value += 1
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--records", type=int, default=200, help="per worker")
+    parser.add_argument("--batch", type=int, default=1, help="records per store_many() call")
+    parser.add_argument("--compact-every", type=int, default=50)
+    parser.add_argument("--readers", type=int, default=2, help="processes searching meanwhile")
+    parser.add_argument("--readonly-readers", action="store_true",
+                        help="readers use VECTOR_STORE_READONLY (memory-mapped index)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        stop = multiprocessing.Event()
+        checks = multiprocessing.Value("i", 0)
+        readers = [
+            multiprocessing.Process(
+                target=reader,
+                args=(r, data_dir, args.compact_every, args.readonly_readers, stop, checks)
+            )
+            for r in range(args.readers)
+        ]
+        for p in readers:
+            p.start()
+
+        start = time.perf_counter()
+        procs = [
+            multiprocessing.Process(
+                target=writer,
+                args=(w, data_dir, args.records, args.batch, args.compact_every)
+            )
+            for w in range(args.workers)
+        ]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        for p in readers:
+            p.join()
+
+        failed = [p.exitcode for p in procs if p.exitcode != 0]
+        if failed:
+            print(f"FAIL: {len(failed)} writer processes exited with errors")
+            sys.exit(1)
+        failed = [p.exitcode for p in readers if p.exitcode != 0]
+        if failed:
+            print(f"FAIL: {len(failed)} reader processes saw misplaced rows or exited with errors")
+            sys.exit(1)
+
+        vector_store = use_store(data_dir, args.compact_every)
+        vector_store._load()
+        records = vector_store.list_records()
+        expected = args.workers * args.records
+        per_worker = {}
+        for r in records:
+            per_worker[r["metadata"]["worker"]] = per_worker.get(r["metadata"]["worker"], 0) + 1
+        texts = vector_store._texts(range(len(vector_store.metadata_store)))
+
+        problems = []
+        if len(records) != expected:
+            problems.append(f"{len(records)} records, expected {expected}")
+        if len(set(texts.values())) != expected:
+            problems.append(f"{len(set(texts.values()))} distinct texts, expected {expected}")
+        if vector_store._indexed_rows() != len(vector_store.metadata_store):
+            problems.append(
+                f"index has {vector_store._indexed_rows()} rows, "
+                f"metadata has {len(vector_store.metadata_store)}"
+            )
+
+        print(f"{args.workers} writers x {args.records} records in {elapsed:.2f}s "
+              f"({expected / elapsed:.0f} records/s), per worker: {per_worker}; "
+              f"{args.readers} readers made {checks.value} consistent searches")
+        if problems:
+            print("FAIL: " + "; ".join(problems))
+            sys.exit(1)
+        print("OK: every record survived exactly once")
+
+if __name__ == "__main__":
+    main()
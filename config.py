@@ -5,14 +5,135 @@
 # ---------------------------
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # local, fast, reliable
 
+# CPU inference backend for EMBEDDING_MODEL:
+#   "torch":       sentence-transformers on PyTorch (default)
+#   "torch_qint8": same model with nn.Linear layers dynamically quantized
+#                  to int8 (torch.ao.quantization.quantize_dynamic)
+#   "onnx":        ONNX Runtime (needs sentence-transformers[onnx]);
+#                  EMBEDDING_ONNX_FILE picks e.g. a quantized export
+# Vectors differ slightly between backends, so embedding caches are keyed
+# by the backend as well.
+EMBEDDING_BACKEND = "torch"
+EMBEDDING_ONNX_FILE = None  # e.g. "onnx/model_qint8_avx512_vnni.onnx"; None = onnx/model.onnx
+EMBEDDING_THREADS = 0  # intra-op threads; 0 = library default (all cores)
+
+# Optional shared embedding worker (python -m memory.embed_server).
+# When enabled and the socket exists, agents embed through the worker
+# instead of loading their own copy of the model.
+USE_EMBEDDING_WORKER = False
+EMBED_BATCH_SIZE = 64  # texts per encode() batch in store_many()
+
+# LRU cache of query text -> embedding used by search()
+QUERY_CACHE_SIZE = 512  # entries; 0 disables the cache
+QUERY_CACHE_PATH = None  # e.g. "data/query_cache.npz" to keep it across runs
+EMBEDDING_SOCKET_PATH = "data/embedder.sock"
+
 # ---------------------------
 # FAISS storage
 # ---------------------------
 DATA_DIR = "data"
 FAISS_INDEX_PATH = "data/cafy.index"
-FAISS_META_PATH = "data/cafy_meta.json"
+FAISS_META_PATH = "data/cafy_meta.db"  # SQLite, one row per index row
+# Imported into FAISS_META_PATH the first time it is opened empty
+LEGACY_META_JSON_PATH = "data/cafy_meta.json"
+
+# Append-only log of records not yet folded into the snapshot above.
+# store() only appends here; the snapshot is rewritten on compaction.
+FAISS_WAL_PATH = "data/cafy.wal"
+WAL_COMPACT_EVERY = 200  # records; 0 = only compact explicitly
+
+# Cross-process write lock: concurrent agents append to one shared log
+FAISS_LOCK_PATH = "data/cafy.lock"
+LOCK_TIMEOUT = 60  # seconds
+
+# Read-only mode for agents that only retrieve: the index file is
+# memory-mapped (shared page cache across processes) instead of read into
+# private memory, and store()/delete()/compact() raise. Each search() picks
+# up new log records and reloads after a compaction (index file changed).
+VECTOR_STORE_READONLY = False
+META_MMAP_SIZE = 256 * 2**20  # bytes of cafy_meta.db mapped by SQLite
+
+# ---------------------------
+# FAISS index type
+# ---------------------------
+# "flat_ip": exact inner-product search (embeddings are normalized)
+# "hnsw":    graph-based ANN, no training needed
+# "ivf":     inverted lists; stays flat_ip until IVF_TRAIN_THRESHOLD vectors,
+#            then is trained and rebuilt on the next compaction
+# "flat_l2": the original exact L2 index (legacy data/cafy.index)
+# "sq8":     int8 scalar quantization, 1 byte per dimension (4x smaller);
+#            stays flat_ip until SQ8_TRAIN_THRESHOLD vectors
+# "pq":      product quantization, PQ_M bytes per vector; stays flat_ip
+#            until PQ_TRAIN_THRESHOLD vectors
+# An index on disk of a different type is rebuilt on load and rewritten
+# on the next compaction. Converting away from sq8/pq keeps the quantized
+# (approximate) vectors; re-ingest to get exact ones back.
+FAISS_INDEX_TYPE = "flat_ip"
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+IVF_NLIST = 0  # 0 = about 4 * sqrt(ntotal)
+IVF_NPROBE = 16
+IVF_TRAIN_THRESHOLD = 20000
+SQ8_TRAIN_THRESHOLD = 1000
+PQ_M = 48  # sub-quantizers; lowered to a divisor of the embedding dimension
+PQ_TRAIN_THRESHOLD = 10000
+
+# ---------------------------
+# Near-duplicate suppression on store()
+# ---------------------------
+# A new record whose nearest neighbour of the same type has cosine
+# similarity >= DEDUP_THRESHOLD is not added. Instead the existing record:
+#   "merge":   is kept as is
+#   "replace": takes the new text and metadata
+# and its "seen_count" is incremented. "off" stores every record.
+DEDUP_POLICY = "merge"
+DEDUP_THRESHOLD = 0.97
+DEDUP_TYPES = ["validated_generation", "correction"]  # cafy_source is keyed by hash
 
 # ---------------------------
 # RAG behavior
 # ---------------------------
 TOP_K_RETRIEVAL = 2
+
+# Context packing for retrieve_memory(): candidates of each type are taken
+# in RAG_TYPE_PRIORITY order, diversified with MMR, until RAG_TOKEN_BUDGET
+# prompt tokens are used.
+RAG_TOKEN_BUDGET = 2000
+RAG_CANDIDATES = 8  # per type
+RAG_MMR_LAMBDA = 0.7  # 1.0 = relevance only, 0.0 = diversity only
+RAG_TYPE_PRIORITY = ["correction", "validated_generation", "cafy_source"]
+RAG_TOKENIZER = "cl100k_base"  # tiktoken encoding used for counting
+
+# Optional cross-encoder re-ranking of each type's candidates before MMR:
+# RERANK_CANDIDATES are fetched, scored on CPU against the query and the
+# best RAG_CANDIDATES kept. RERANK_BUDGET_MS is shared by all types of one
+# retrieval: once scoring would exceed it, the remaining types keep the
+# bi-encoder order (model loading is not counted).
+RERANK_ENABLED = False
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_CANDIDATES = 20  # per type
+RERANK_BUDGET_MS = 150
+RERANK_BATCH_SIZE = 8
+RERANK_MAX_CHARS = 2000  # of each record's text passed to the model
+RERANK_CACHE_SIZE = 4096  # (query, record) scores kept in memory
+
+# ---------------------------
+# LLM response cache
+# ---------------------------
+# Content-addressed by model, messages, tools and sampling parameters.
+# Only deterministic (temperature 0) calls are cached.
+LLM_CACHE_ENABLED = True
+LLM_CACHE_DIR = "data/llm_cache"
+LLM_CACHE_MAX_BYTES = 200 * 2**20  # least recently used entries evicted beyond this
+
+# ---------------------------
+# Agent telemetry
+# ---------------------------
+# One JSON line per run_cycle with per-iteration step timings, token counts,
+# tool calls and retries; cumulative totals in Prometheus textfile format
+# (for node_exporter's textfile collector).
+# Report: python -m agent_core.telemetry report
+TELEMETRY_ENABLED = True
+TELEMETRY_PATH = "data/telemetry.jsonl"
+TELEMETRY_PROM_PATH = "data/cafta.prom"  # one file per process: data/cafta.<pid>.prom
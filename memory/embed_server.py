@@ -0,0 +1,51 @@
+# memory/embed_server.py
+#
+# Long-lived embedding worker. Start it once:
+#
+#     python -m memory.embed_server
+#
+# and set USE_EMBEDDING_WORKER = True in config.py. Every agent process
+# then embeds through this worker instead of loading its own model.
+import os
+import json
+import struct
+import threading
+import socketserver
+
+from config import EMBEDDING_SOCKET_PATH
+from memory.embedder import get_embedder, _embed_local, _recv_exact
+
+_encode_lock = threading.Lock()
+
+class EmbeddingHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        (length,) = struct.unpack("!I", _recv_exact(self.request, 4))
+        request = json.loads(_recv_exact(self.request, length).decode("utf-8"))
+
+        with _encode_lock:
+            emb = _embed_local(request["texts"])
+
+        rows, dim = emb.shape
+        self.request.sendall(struct.pack("!II", rows, dim) + emb.tobytes())
+
+class EmbeddingServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+def serve(path=EMBEDDING_SOCKET_PATH):
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    # Load the model before accepting connections so the first client
+    # does not pay the start-up cost.
+    get_embedder()
+
+    with EmbeddingServer(path, EmbeddingHandler) as server:
+        print(f"Embedding worker listening on {path}")
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(path)
+
+if __name__ == "__main__":
+    serve()
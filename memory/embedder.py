@@ -0,0 +1,122 @@
+# memory/embedder.py
+import os
+import socket
+import struct
+import json
+import threading
+import numpy as np
+
+from config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
+    EMBEDDING_ONNX_FILE,
+    EMBEDDING_THREADS,
+    EMBED_BATCH_SIZE,
+    EMBEDDING_SOCKET_PATH,
+    USE_EMBEDDING_WORKER
+)
+
+# ---------------------------
+# Lazy embedding model
+# ---------------------------
+# SentenceTransformer pulls in torch, which dominates start-up time.
+# It is only imported and loaded the first time something is embedded.
+_model = None
+_model_lock = threading.Lock()
+
+def _load_model():
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if EMBEDDING_THREADS:
+        torch.set_num_threads(EMBEDDING_THREADS)
+
+    if EMBEDDING_BACKEND == "torch":
+        return SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+
+    if EMBEDDING_BACKEND == "torch_qint8":
+        model = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+        return torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+    if EMBEDDING_BACKEND == "onnx":
+        model_kwargs = {"provider": "CPUExecutionProvider"}
+        if EMBEDDING_ONNX_FILE:
+            model_kwargs["file_name"] = EMBEDDING_ONNX_FILE
+        if EMBEDDING_THREADS:
+            import onnxruntime
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = EMBEDDING_THREADS
+            model_kwargs["session_options"] = options
+        return SentenceTransformer(EMBEDDING_MODEL, device="cpu", backend="onnx",
+                                   model_kwargs=model_kwargs)
+
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {EMBEDDING_BACKEND}")
+
+def get_embedder():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = _load_model()
+    return _model
+
+def _embed_local(texts, batch_size=EMBED_BATCH_SIZE):
+    return get_embedder().encode(
+        texts,
+        batch_size=batch_size,
+        normalize_embeddings=True
+    ).astype("float32")
+
+# ---------------------------
+# Shared embedding worker (Unix socket)
+# ---------------------------
+# Wire format (both directions are length-prefixed):
+#   request:  !I length + JSON {"texts": [...]}
+#   response: !II (rows, dim) + rows * dim float32 values
+def _recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("Embedding worker closed the connection")
+        buf.extend(chunk)
+    return bytes(buf)
+
+def _embed_remote(texts):
+    payload = json.dumps({"texts": list(texts)}).encode("utf-8")
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(EMBEDDING_SOCKET_PATH)
+        sock.sendall(struct.pack("!I", len(payload)) + payload)
+
+        rows, dim = struct.unpack("!II", _recv_exact(sock, 8))
+        data = _recv_exact(sock, rows * dim * 4)
+
+    return np.frombuffer(data, dtype="float32").reshape(rows, dim)
+
+def _worker_available():
+    return USE_EMBEDDING_WORKER and os.path.exists(EMBEDDING_SOCKET_PATH)
+
+# ---------------------------
+# Public API
+# ---------------------------
+def model_id():
+    # Anything that changes the vectors must change this id; caches of
+    # embeddings are keyed by it.
+    if EMBEDDING_BACKEND == "torch":
+        return EMBEDDING_MODEL
+    if EMBEDDING_BACKEND == "onnx":
+        return f"{EMBEDDING_MODEL}:onnx:{EMBEDDING_ONNX_FILE or 'model.onnx'}"
+    return f"{EMBEDDING_MODEL}:{EMBEDDING_BACKEND}"
+
+def embed(texts, batch_size=EMBED_BATCH_SIZE):
+    if _worker_available():
+        try:
+            return _embed_remote(texts)
+        except (ConnectionError, OSError):
+            # Stale socket or worker restarting: fall back to in-process model
+            pass
+
+    return _embed_local(texts, batch_size=batch_size)
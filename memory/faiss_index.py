@@ -0,0 +1,183 @@
+# memory/faiss_index.py
+import math
+import faiss
+import numpy as np
+
+from config import (
+    FAISS_INDEX_TYPE,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    IVF_NLIST,
+    IVF_NPROBE,
+    IVF_TRAIN_THRESHOLD,
+    SQ8_TRAIN_THRESHOLD,
+    PQ_M,
+    PQ_TRAIN_THRESHOLD
+)
+
+# Kinds that store compressed codes instead of float32 vectors
+QUANTIZED_KINDS = ("sq8", "pq")
+
+# Kinds that need training data, and how many vectors before they are used
+_TRAIN_THRESHOLDS = {
+    "ivf": IVF_TRAIN_THRESHOLD,
+    "sq8": SQ8_TRAIN_THRESHOLD,
+    "pq": PQ_TRAIN_THRESHOLD
+}
+
+# ---------------------------
+# Index factory
+# ---------------------------
+def index_kind(index):
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "sq8"
+    if isinstance(index, faiss.IndexPQ):
+        return "pq"
+    if index.metric_type == faiss.METRIC_L2:
+        return "flat_l2"
+    return "flat_ip"
+
+def target_kind(ntotal, kind=FAISS_INDEX_TYPE):
+    # IVF, SQ8 and PQ need training data; below the threshold an exact
+    # index is exact and small enough, so use that until there are enough.
+    if ntotal < _TRAIN_THRESHOLDS.get(kind, 0):
+        return "flat_ip"
+    return kind
+
+def _nlist(ntotal):
+    return IVF_NLIST or max(1, int(4 * math.sqrt(ntotal)))
+
+def _pq_m(dim):
+    # Sub-quantizers must split the dimension evenly
+    return max(m for m in range(1, min(PQ_M, dim) + 1) if dim % m == 0)
+
+def configure(index):
+    # Search-time parameters are not persisted by faiss.write_index
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = IVF_NPROBE
+    return index
+
+def build_index(dim, vectors=None, kind=FAISS_INDEX_TYPE, add=True):
+    # add=False returns the trained but empty index (e.g. to wrap in IndexIDMap)
+    ntotal = 0 if vectors is None else len(vectors)
+    kind = target_kind(ntotal, kind)
+
+    if kind == "flat_l2":
+        index = faiss.IndexFlatL2(dim)
+    elif kind == "flat_ip":
+        index = faiss.IndexFlatIP(dim)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif kind == "ivf":
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, _nlist(ntotal), faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        # Keeps reconstruct() working for migrations and sub-indexes
+        index.make_direct_map()
+    elif kind == "sq8":
+        index = faiss.IndexScalarQuantizer(
+            dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+        )
+        # Widen the trained per-dimension range by 10% so vectors added
+        # after training are not clipped
+        index.sq.rangestat = faiss.ScalarQuantizer.RS_minmax
+        index.sq.rangestat_arg = 0.1
+        index.train(vectors)
+    elif kind == "pq":
+        index = faiss.IndexPQ(dim, _pq_m(dim), 8, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+    else:
+        raise ValueError(f"Unknown FAISS_INDEX_TYPE: {kind}")
+
+    configure(index)
+    if ntotal and add:
+        index.add(vectors)
+    return index
+
+def _is_ivf_file(path):
+    # Serialized IVF indexes start with an "Iw.." fourcc
+    with open(path, "rb") as f:
+        return f.read(2) == b"Iw"
+
+def read_index(path, mmap=False):
+    if mmap:
+        # Mapped from the file, not copied, so every reader shares one copy
+        # in the page cache. IO_FLAG_MMAP only covers IVF inverted lists;
+        # flat-code indexes (flat, sq8, pq) need IO_FLAG_MMAP_IFC.
+        # Such an index cannot be added to.
+        flag = faiss.IO_FLAG_MMAP if _is_ivf_file(path) else faiss.IO_FLAG_MMAP_IFC
+        index = faiss.read_index(path, flag | faiss.IO_FLAG_READ_ONLY)
+    else:
+        index = faiss.read_index(path)
+    return configure(index)
+
+def search_params(index, ids):
+    # Restrict a search to the given row ids without copying any vectors.
+    # None if the index cannot take a selector (IndexPQ).
+    if isinstance(index, faiss.IndexPQ):
+        return None
+    sel = faiss.IDSelectorBatch(np.asarray(ids, dtype="int64"))
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=sel, efSearch=HNSW_EF_SEARCH)
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=sel, nprobe=IVF_NPROBE)
+    return faiss.SearchParameters(sel=sel)
+
+def reconstruct_all(index):
+    if isinstance(index, faiss.IndexIVF):
+        index.make_direct_map()
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype="float32")
+    return index.reconstruct_n(0, index.ntotal)
+
+def needs_rebuild(index, kind=FAISS_INDEX_TYPE):
+    return index_kind(index) != target_kind(index.ntotal, kind)
+
+def rebuild(index, kind=FAISS_INDEX_TYPE):
+    # Row order is preserved, so metadata positions stay valid
+    return build_index(index.d, reconstruct_all(index), kind)
+
+def remove_rows(index, positions):
+    # Drop rows; the rest shift down in order, like the metadata rows.
+    # Flat-code indexes (flat, sq8, pq) do this in place without
+    # retraining; HNSW and IVF are rebuilt from their stored vectors.
+    if isinstance(index, faiss.IndexFlatCodes):
+        index.remove_ids(faiss.IDSelectorBatch(np.asarray(positions, dtype="int64")))
+        return index
+    keep = np.setdiff1d(np.arange(index.ntotal), np.asarray(positions, dtype="int64"))
+    return build_index(index.d, reconstruct_all(index)[keep], index_kind(index))
+
+def footprint(index):
+    # Bytes held by the index's data, computed from its sizes: serializing
+    # it would copy the whole index (and every mapped page) into memory
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        return footprint(index.index) + index.ntotal * 8
+    if isinstance(index, faiss.IndexHNSW):
+        hnsw = index.hnsw
+        graph = (hnsw.neighbors.size() + hnsw.levels.size()) * 4 + hnsw.offsets.size() * 8
+        return footprint(index.storage) + graph
+    if isinstance(index, faiss.IndexIVF):
+        entries = sum(index.invlists.list_size(i) for i in range(index.nlist))
+        return footprint(index.quantizer) + entries * (index.code_size + 8)
+
+    size = index.ntotal * index.code_size
+    if isinstance(index, faiss.IndexPQ):
+        size += index.pq.centroids.size() * 4
+    elif isinstance(index, faiss.IndexScalarQuantizer):
+        size += index.sq.trained.size() * 4
+    return int(size)
+
+def to_similarity(index, distances):
+    # Embeddings are unit-normalized: ||a - b||^2 = 2 - 2 * cos(a, b)
+    if index.metric_type == faiss.METRIC_L2:
+        return 1.0 - distances / 2.0
+    return distances
@@ -0,0 +1,140 @@
+# memory/meta_store.py
+import json
+import os
+import sqlite3
+import threading
+
+# ---------------------------
+# SQLite metadata store
+# ---------------------------
+# One row per FAISS row, keyed by its position in the index. Texts stay on
+# disk and are read per row on demand; the vector store only keeps ids,
+# metadata and tombstone flags in memory.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    pos      INTEGER PRIMARY KEY,
+    id       TEXT NOT NULL UNIQUE,
+    type     TEXT,
+    metadata TEXT NOT NULL,
+    deleted  INTEGER NOT NULL DEFAULT 0,
+    text     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_type ON records(type);
+CREATE TABLE IF NOT EXISTS state (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+class MetaStore:
+    def __init__(self, path: str, readonly: bool = False, mmap_size: int = 0):
+        self.path = path
+        self._lock = threading.Lock()
+        # Read-only before any writer created the database (e.g. a fresh
+        # checkout with only cafy_meta.json): an empty private store
+        self.in_memory = readonly and not os.path.exists(path)
+        if self.in_memory:
+            self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+        elif readonly:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=FULL")
+            self._conn.executescript(SCHEMA)
+        if mmap_size:
+            # Reads come straight from the shared page cache
+            self._conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def load_headers(self):
+        # Everything but the text, in row order
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, metadata, deleted FROM records ORDER BY pos"
+            ).fetchall()
+        return [
+            {"id": record_id, "metadata": json.loads(metadata), "deleted": bool(deleted)}
+            for record_id, metadata, deleted in rows
+        ]
+
+    def text(self, pos: int) -> str:
+        return self.texts([pos]).get(pos, "")
+
+    def texts(self, positions):
+        positions = list(positions)
+        if not positions:
+            return {}
+        marks = ",".join("?" * len(positions))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT pos, text FROM records WHERE pos IN ({marks})", positions
+            ).fetchall()
+        return dict(rows)
+
+    def write(self, rows):
+        # rows: (pos, record). Records carrying "text" are upserted in full;
+        # the rest (e.g. counter updates) only touch metadata and deleted.
+        with self._lock, self._conn:
+            for pos, record in rows:
+                metadata = json.dumps(record["metadata"], ensure_ascii=False)
+                deleted = int(bool(record.get("deleted")))
+                if "text" in record:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO records (pos, id, type, metadata, deleted, text) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (pos, record["id"], record["metadata"].get("type"), metadata, deleted, record["text"])
+                    )
+                else:
+                    self._conn.execute(
+                        "UPDATE records SET metadata = ?, deleted = ? WHERE pos = ?",
+                        (metadata, deleted, pos)
+                    )
+
+    def import_json(self, json_path: str):
+        # One-off migration from the old pretty-printed cafy_meta.json array
+        with open(json_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        self.write(enumerate(records))
+        return len(records)
+
+    def reclaim(self, removed, rows: int):
+        # Drop the given rows and renumber the rest 0..n-1 in order, in one
+        # transaction. The old row count and the removed positions are kept
+        # in `state` until the index has been rewritten to match
+        # (clear_reclaim), so a crash in between can be finished on load.
+        removed = set(removed)
+        live = [pos for pos in range(rows) if pos not in removed]
+        with self._lock, self._conn:
+            # Negative positions first: renumbering in place would collide
+            self._conn.executemany(
+                "UPDATE records SET pos = ? WHERE pos = ?",
+                [(-1 - new, old) for new, old in enumerate(live)]
+            )
+            self._conn.execute("DELETE FROM records WHERE pos >= 0")
+            self._conn.execute("UPDATE records SET pos = -1 - pos")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state (key, value) VALUES ('reclaim', ?)",
+                (json.dumps({"rows": rows, "removed": sorted(removed)}),)
+            )
+
+    def pending_reclaim(self):
+        with self._lock:
+            try:
+                row = self._conn.execute("SELECT value FROM state WHERE key = 'reclaim'").fetchone()
+            except sqlite3.OperationalError:
+                # Read-only open of a store from before the state table
+                return None
+        return json.loads(row[0]) if row else None
+
+    def clear_reclaim(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM state WHERE key = 'reclaim'")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,95 @@
+# memory/query_cache.py
+import os
+import atexit
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from config import QUERY_CACHE_SIZE, QUERY_CACHE_PATH
+from memory.embedder import embed, model_id
+
+# ---------------------------
+# Query embedding cache
+# ---------------------------
+# Normalized query text -> (1, dim) float32 embedding, least recently used
+# evicted first. Entries are only valid for the model that produced them.
+_cache = OrderedDict()
+_cache_model = None
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+def _normalize(text):
+    return " ".join(text.split())
+
+def _check_model():
+    global _cache_model
+    current = model_id()
+    if _cache_model != current:
+        _cache.clear()
+        _cache_model = current
+        _load()
+
+def _load():
+    if not QUERY_CACHE_PATH or not os.path.exists(QUERY_CACHE_PATH):
+        return
+    try:
+        data = np.load(QUERY_CACHE_PATH)
+    except (OSError, ValueError):
+        return
+    if str(data["model"]) != _cache_model:
+        return
+    for text, vec in zip(data["texts"], data["vectors"]):
+        _cache[str(text)] = vec.reshape(1, -1)
+
+def save():
+    if not QUERY_CACHE_PATH or not _cache:
+        return
+    with _lock:
+        texts = np.array(list(_cache.keys()))
+        vectors = np.vstack(list(_cache.values()))
+    tmp_path = QUERY_CACHE_PATH + ".tmp.npz"
+    np.savez(tmp_path, model=np.array(_cache_model), texts=texts, vectors=vectors)
+    os.replace(tmp_path, QUERY_CACHE_PATH)
+
+if QUERY_CACHE_PATH:
+    atexit.register(save)
+
+# ---------------------------
+# Public API
+# ---------------------------
+def embed_query(text: str):
+    if not QUERY_CACHE_SIZE:
+        _stats["misses"] += 1
+        return embed([text])
+
+    key = _normalize(text)
+    with _lock:
+        _check_model()
+        vec = _cache.get(key)
+        if vec is not None:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return vec
+        _stats["misses"] += 1
+
+    vec = embed([key])
+    with _lock:
+        _cache[key] = vec
+        while len(_cache) > QUERY_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return vec
+
+def cache_stats():
+    total = _stats["hits"] + _stats["misses"]
+    return {
+        "hits": _stats["hits"],
+        "misses": _stats["misses"],
+        "size": len(_cache),
+        "hit_rate": _stats["hits"] / total if total else 0.0
+    }
+
+def clear():
+    with _lock:
+        _cache.clear()
+        _stats["hits"] = 0
+        _stats["misses"] = 0
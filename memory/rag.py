@@ -1,6 +1,112 @@
+import time
+
+from config import (
+    RAG_TOKEN_BUDGET,
+    RAG_CANDIDATES,
+    RAG_MMR_LAMBDA,
+    RAG_TYPE_PRIORITY,
+    RAG_TOKENIZER,
+    RERANK_ENABLED,
+    RERANK_CANDIDATES,
+    RERANK_BUDGET_MS
+)
+
 from memory.vector_store import search
+from memory.rerank import rerank
+
+# ---------------------------
+# Token counting
+# ---------------------------
+_encoding = None
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(RAG_TOKENIZER)
+        except Exception:
+            # No cached BPE file and no network: fall back to an estimate
+            _encoding = False
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+def _truncate(text, max_tokens):
+    encoding = _get_encoding()
+    if encoding:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    return text[:max_tokens * 4]
+
+# ---------------------------
+# Context packing
+# ---------------------------
+def _mmr_order(candidates, selected_vectors, lam):
+    # Maximal marginal relevance: trade query relevance against similarity
+    # to what has already been picked (including higher-priority types).
+    remaining = list(candidates)
+    chosen = list(selected_vectors)
+    while remaining:
+        def mmr(doc):
+            redundancy = max((float(doc["vector"] @ v) for v in chosen), default=0.0)
+            return lam * doc.get("rerank_score", doc["score"]) - (1 - lam) * redundancy
+
+        best = max(remaining, key=mmr)
+        remaining.remove(best)
+        chosen.append(best["vector"])
+        yield best
+
+def _format(doc):
+    return f"[{doc['metadata'].get('type', 'memory')}]\n{doc['text']}"
+
+def _candidates(query, type_name, budget_ms):
+    # Returns (candidates, milliseconds spent re-ranking)
+    if not RERANK_ENABLED:
+        return search(query, RAG_CANDIDATES, where={"type": type_name}, with_vectors=True), 0.0
+    candidates = search(query, RERANK_CANDIDATES, where={"type": type_name}, with_vectors=True)
+    if budget_ms <= 0:
+        # Spent on earlier types: keep bi-encoder order
+        return candidates[:RAG_CANDIDATES], 0.0
+    start = time.perf_counter()
+    ranked = rerank(query, candidates, budget_ms=budget_ms)
+    return ranked[:RAG_CANDIDATES], (time.perf_counter() - start) * 1000
+
+def pack_context(query: str, token_budget: int = RAG_TOKEN_BUDGET, k: int = None):
+    selected, vectors, used = [], [], 0
+    separator_tokens = count_tokens("\n\n")
+
+    # RERANK_BUDGET_MS covers the whole retrieval, shared across the types
+    rerank_budget_ms = RERANK_BUDGET_MS
+    for type_name in RAG_TYPE_PRIORITY:
+        candidates, spent_ms = _candidates(query, type_name, rerank_budget_ms)
+        rerank_budget_ms -= spent_ms
+
+        for doc in _mmr_order(candidates, vectors, RAG_MMR_LAMBDA):
+            if k is not None and len(selected) >= k:
+                return selected
+            remaining = token_budget - used - (separator_tokens if selected else 0)
+            if remaining <= 0:
+                return selected
+
+            block = _format(doc)
+            tokens = count_tokens(block)
+            if tokens > remaining:
+                # Only cut a record to fit when nothing else made it in yet,
+                # otherwise look for a smaller record that fits whole.
+                if selected:
+                    continue
+                block = _truncate(block, remaining)
+                tokens = count_tokens(block)
+
+            selected.append(block)
+            vectors.append(doc["vector"])
+            used += tokens + (separator_tokens if len(selected) > 1 else 0)
+
+    return selected
 
-def retrieve_memory(query: str, k: int = 3) -> str:
-    docs = search(query, k)
-    joined = "\n\n".join(docs)
-    return joined[:8000]   # hard cap
+def retrieve_memory(query: str, k: int = None, token_budget: int = RAG_TOKEN_BUDGET) -> str:
+    return "\n\n".join(pack_context(query, token_budget=token_budget, k=k))
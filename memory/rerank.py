@@ -0,0 +1,127 @@
+# memory/rerank.py
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from config import (
+    RERANK_MODEL,
+    RERANK_BUDGET_MS,
+    RERANK_BATCH_SIZE,
+    RERANK_MAX_CHARS,
+    RERANK_CACHE_SIZE
+)
+
+# ---------------------------
+# Lazy cross-encoder
+# ---------------------------
+_model = None
+_model_failed = False
+_model_lock = threading.Lock()
+
+def get_reranker():
+    global _model, _model_failed
+    if _model is None and not _model_failed:
+        with _model_lock:
+            if _model is None and not _model_failed:
+                try:
+                    from sentence_transformers import CrossEncoder
+                    _model = CrossEncoder(RERANK_MODEL, device="cpu")
+                except Exception as e:
+                    # No model available: retrieval keeps bi-encoder order
+                    print(f"[rerank] disabled, could not load {RERANK_MODEL}: {e}")
+                    _model_failed = True
+    return _model
+
+# ---------------------------
+# (query, record) score cache
+# ---------------------------
+# Keyed on the record text rather than its id, so a record replaced by
+# dedup is scored again.
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {"calls": 0, "fallbacks": 0, "hits": 0, "scored": 0}
+_pair_seconds = None  # running estimate of the cost of scoring one pair
+
+def _key(query, text):
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    return " ".join(query.split()), digest
+
+def _cached(key):
+    with _lock:
+        score = _cache.get(key)
+        if score is not None:
+            _cache.move_to_end(key)
+        return score
+
+def _put(key, score):
+    with _lock:
+        _cache[key] = score
+        _cache.move_to_end(key)
+        while len(_cache) > RERANK_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+# ---------------------------
+# Public API
+# ---------------------------
+def rerank(query: str, docs, budget_ms: float = RERANK_BUDGET_MS):
+    """
+    Reorder search() results by cross-encoder relevance. Each doc gets a
+    "rerank_score" in (0, 1) (sigmoid of the model logit). If the uncached
+    pairs cannot be scored within budget_ms, docs are returned unchanged
+    in bi-encoder order; pairs scored before giving up stay cached.
+    """
+    global _pair_seconds
+    _stats["calls"] += 1
+    if not docs:
+        return docs
+
+    model = get_reranker()
+    if model is None:
+        _stats["fallbacks"] += 1
+        return docs
+
+    budget = budget_ms / 1000.0
+    start = time.perf_counter()
+
+    keys = [_key(query, doc["text"]) for doc in docs]
+    scores = [_cached(key) for key in keys]
+    missing = [i for i, score in enumerate(scores) if score is None]
+    _stats["hits"] += len(docs) - len(missing)
+
+    for batch_start in range(0, len(missing), RERANK_BATCH_SIZE):
+        batch = missing[batch_start:batch_start + RERANK_BATCH_SIZE]
+        elapsed = time.perf_counter() - start
+        if _pair_seconds is not None and elapsed + _pair_seconds * len(batch) > budget:
+            _stats["fallbacks"] += 1
+            return docs
+
+        batch_start_time = time.perf_counter()
+        logits = model.predict(
+            [(query, docs[i]["text"][:RERANK_MAX_CHARS]) for i in batch],
+            batch_size=RERANK_BATCH_SIZE
+        )
+        per_pair = (time.perf_counter() - batch_start_time) / len(batch)
+        _pair_seconds = per_pair if _pair_seconds is None else 0.8 * _pair_seconds + 0.2 * per_pair
+
+        for i, logit in zip(batch, logits):
+            scores[i] = 1.0 / (1.0 + math.exp(-float(logit)))
+            _put(keys[i], scores[i])
+        _stats["scored"] += len(batch)
+
+    if time.perf_counter() - start > budget:
+        _stats["fallbacks"] += 1
+        return docs
+
+    ranked = [dict(doc, rerank_score=score) for doc, score in zip(docs, scores)]
+    ranked.sort(key=lambda doc: doc["rerank_score"], reverse=True)
+    return ranked
+
+def rerank_stats():
+    with _lock:
+        return dict(_stats, size=len(_cache))
+
+def clear():
+    with _lock:
+        _cache.clear()
@@ -1,15 +1,33 @@
 import os
 import json
 import uuid
+import base64
+import threading
+from contextlib import contextmanager
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from filelock import FileLock
 
 from config import (
-    EMBEDDING_MODEL,
     FAISS_INDEX_PATH,
-    FAISS_META_PATH
+    FAISS_META_PATH,
+    LEGACY_META_JSON_PATH,
+    VECTOR_STORE_READONLY,
+    META_MMAP_SIZE,
+    FAISS_WAL_PATH,
+    FAISS_LOCK_PATH,
+    LOCK_TIMEOUT,
+    WAL_COMPACT_EVERY,
+    EMBED_BATCH_SIZE,
+    DEDUP_POLICY,
+    DEDUP_THRESHOLD,
+    DEDUP_TYPES,
+    FAISS_INDEX_TYPE
 )
+from memory.embedder import embed
+from memory.query_cache import embed_query
+from memory import faiss_index
+from memory.meta_store import MetaStore
 
 # ---------------------------
 # Ensure data directory exists
@@ -17,70 +35,733 @@ from config import (
 os.makedirs(os.path.dirname(FAISS_INDEX_PATH), exist_ok=True)
 
 # ---------------------------
-# Load embedding model
+# Lazy index / metadata state
 # ---------------------------
-embedder = SentenceTransformer(EMBEDDING_MODEL)
-DIM = embedder.get_sentence_embedding_dimension()
+# Loaded on first store()/search() so that importing this module stays cheap.
+#
+# metadata_store[pos] mirrors row pos of the index as {"id", "metadata",
+# "deleted"}. Texts live in the SQLite store; only records changed since the
+# last compaction also carry "text" in memory (_dirty holds their rows).
+index = None
+metadata_store = None
+_meta = None
+_dirty = set()
+_id_to_pos = {}
+_deleted = 0
+_wal_records = 0
+_wal_offset = 0
+
+# type -> IndexIDMap over the live rows of that metadata type, keyed by row
+# position. Built on the first search(where={"type": ...}) and kept in step
+# with adds and deletes afterwards.
+_type_indexes = None
+
+# Read-only mode: the memory-mapped snapshot cannot be added to, so rows
+# replayed from the log go to a small private index after it (_delta), and
+# type filters select rows of the shared index instead of copying vectors
+# into sub-indexes (_type_rows: type -> row positions).
+_delta = None
+_type_rows = None
+_snapshot_sig = None
+
+def _stat_sig(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def _load():
+    global index, metadata_store, _meta, _type_indexes, _delta, _type_rows
+    global _snapshot_sig, _wal_offset, _wal_records
+
+    if metadata_store is not None:
+        return
+
+    _snapshot_sig = _stat_sig(FAISS_INDEX_PATH)
+    try:
+        if os.path.exists(FAISS_INDEX_PATH):
+            index = faiss_index.read_index(FAISS_INDEX_PATH, mmap=VECTOR_STORE_READONLY)
+        else:
+            raise RuntimeError("Index not found")
+    except Exception:
+        # Created on first store(), once the embedding dimension is known
+        index = None
+
+    # Migrate e.g. the legacy IndexFlatL2 to FAISS_INDEX_TYPE. The rebuilt
+    # index keeps row order and is written out on the next compaction.
+    # Read-only agents search whatever is on disk and leave this to writers.
+    if index is not None and not VECTOR_STORE_READONLY and faiss_index.needs_rebuild(index):
+        index = faiss_index.rebuild(index)
+
+    if _meta is not None:
+        _meta.close()
+    _meta = MetaStore(FAISS_META_PATH, readonly=VECTOR_STORE_READONLY, mmap_size=META_MMAP_SIZE)
+    # Readers without a database import into their private in-memory store
+    writable = not VECTOR_STORE_READONLY or _meta.in_memory
+    if writable and _meta.count() == 0 and os.path.exists(LEGACY_META_JSON_PATH):
+        _meta.import_json(LEGACY_META_JSON_PATH)
+    metadata_store = _meta.load_headers()
+    _dirty.clear()
+
+    # A compaction that renumbered the metadata but crashed before writing
+    # the index: drop the same rows here (see _reclaim)
+    pending = _meta.pending_reclaim()
+    if pending is not None and index is not None and index.ntotal == pending["rows"]:
+        if VECTOR_STORE_READONLY:
+            index = faiss.clone_index(index)
+        index = faiss_index.remove_rows(index, pending["removed"])
+    _reconcile()
+
+    _type_indexes = None
+    _delta = None
+    _type_rows = None
+    _wal_offset = 0
+    _wal_records = 0
+    _reindex()
+    _replay_wal()
+
+def _reconcile():
+    # Row pos of the index must be the vector of metadata_store[pos]. An
+    # older snapshot can disagree (the shipped cafy.index holds 16 vectors
+    # for 12 records, with rows 3 and 4 identical), and then there is no
+    # telling which rows belong to which records: every record is
+    # re-embedded from its stored text. Writers persist it on compaction.
+    global index
+
+    rows = len(metadata_store)
+    ntotal = index.ntotal if index is not None else 0
+    if ntotal == rows:
+        return
+
+    print(f"[vector_store] index has {ntotal} rows for {rows} records: re-embedding all records")
+    texts = _meta.texts(range(rows))
+    vectors = _embed([texts.get(pos, "") for pos in range(rows)]) if rows else None
+    if vectors is None:
+        index = faiss_index.build_index(index.d)
+    else:
+        index = faiss_index.build_index(vectors.shape[1], vectors)
+
+def _changed():
+    if _stat_sig(FAISS_INDEX_PATH) != _snapshot_sig:
+        return True
+    try:
+        wal_size = os.path.getsize(FAISS_WAL_PATH)
+    except FileNotFoundError:
+        wal_size = 0
+    return wal_size != _wal_offset
+
+def _refresh():
+    # Nothing new: no lock needed. Otherwise catch up under the file lock,
+    # so a load never sees a compaction half done (new index, metadata not
+    # yet committed, log already truncated) and takes it for a snapshot.
+    if metadata_store is not None and not _changed():
+        return
+    with _state_lock, _lock():
+        _catch_up()
+
+def _catch_up():
+    global metadata_store
+
+    # Another process compacted: the snapshot changed under us, start over
+    if metadata_store is not None and _stat_sig(FAISS_INDEX_PATH) != _snapshot_sig:
+        metadata_store = None
+    if metadata_store is None:
+        _load()
+        return
+
+    # Otherwise only read what was appended to the log since last time
+    try:
+        wal_size = os.path.getsize(FAISS_WAL_PATH)
+    except FileNotFoundError:
+        wal_size = 0
+    if wal_size < _wal_offset:
+        metadata_store = None
+        _load()
+    elif wal_size > _wal_offset:
+        _replay_wal()
+
+def _indexed_rows():
+    return (index.ntotal if index is not None else 0) + (_delta.ntotal if _delta is not None else 0)
+
+def _check_writable():
+    if VECTOR_STORE_READONLY:
+        raise RuntimeError("vector store is read-only (VECTOR_STORE_READONLY)")
 
 # ---------------------------
-# Load / Init FAISS index
+# Concurrency
 # ---------------------------
-try:
-    if os.path.exists(FAISS_INDEX_PATH):
-        index = faiss.read_index(FAISS_INDEX_PATH)
-    else:
-        raise RuntimeError("Index not found")
-except Exception:
-    index = faiss.IndexFlatL2(DIM)
+# Several agent processes may write at once. Every write takes an exclusive
+# file lock, first catches up with whatever other writers appended to the
+# log (or compacted) since this process last looked, and only then assigns
+# row positions and appends. The log is therefore a single ordered history
+# shared by all writers and no record is lost. Readers take the same lock
+# while catching up (_refresh). _state_lock serializes threads within one
+# process around the in-memory state.
+_state_lock = threading.RLock()
+_file_lock = None
+
+def _lock():
+    global _file_lock
+    if _file_lock is None:
+        _file_lock = FileLock(FAISS_LOCK_PATH, timeout=LOCK_TIMEOUT)
+    return _file_lock
+
+@contextmanager
+def _writing():
+    _check_writable()
+    with _state_lock, _lock():
+        _catch_up()
+        _repair_wal()
+        yield
+
+def _reindex():
+    global _id_to_pos, _deleted
+    _id_to_pos = {r["id"]: pos for pos, r in enumerate(metadata_store)}
+    _deleted = sum(1 for r in metadata_store if r["deleted"])
 
+# ---------------------------
+# Write-ahead log
+# ---------------------------
+# One JSON line per operation:
+#   {"op": "add", "pos": <row>, "id", "text", "metadata", "vector": <b64 float32>}
+#   {"op": "delete", "ids": [...]}
+#   {"op": "update", "id", "metadata", ["text"]}
+#
+# "pos" is the row the record occupies in the index. Replay skips rows the
+# snapshot already holds and updates/deletes are idempotent, so a crash at any
+# point during compaction (index replaced, metadata not yet committed, log not
+# yet truncated) replays cleanly.
+#
+# Deletes are tombstones: the row keeps its vector so positions never shift
+# between compactions, but its text is dropped and search() skips it.
+# Compaction reclaims them (_reclaim) once the log is empty.
+def _encode_vector(vec):
+    return base64.b64encode(np.ascontiguousarray(vec, dtype="float32").tobytes()).decode("ascii")
+
+def _decode_vector(data):
+    return np.frombuffer(base64.b64decode(data), dtype="float32").reshape(1, -1)
+
+def _apply(entries, vectors):
+    global index, _delta, _deleted, _type_rows
+
+    _type_rows = None
+
+    # vectors holds one row per "add" entry, in order
+    adds = [e for e in entries if e["op"] == "add"]
+    if adds:
+        new_rows = [i for i, e in enumerate(adds) if e["pos"] >= _indexed_rows()]
+        if new_rows and VECTOR_STORE_READONLY:
+            if _delta is None:
+                _delta = faiss.IndexFlatIP(vectors.shape[1])
+            _delta.add(vectors[new_rows])
+        elif new_rows:
+            if index is None:
+                index = faiss_index.build_index(vectors.shape[1])
+            index.add(vectors[new_rows])
+
+        for i, entry in enumerate(adds):
+            if entry["pos"] >= len(metadata_store):
+                _id_to_pos[entry["id"]] = len(metadata_store)
+                metadata_store.append({
+                    "id": entry["id"],
+                    "text": entry["text"],
+                    "metadata": entry["metadata"],
+                    "deleted": False
+                })
+                _dirty.add(entry["pos"])
+                if _type_indexes is not None:
+                    _type_index_add(entry["metadata"].get("type"), entry["pos"], vectors[i:i + 1])
+
+    for entry in entries:
+        if entry["op"] == "update":
+            pos = _id_to_pos.get(entry["id"])
+            if pos is None or metadata_store[pos]["deleted"]:
+                continue
+            metadata_store[pos]["metadata"] = entry["metadata"]
+            if "text" in entry:
+                metadata_store[pos]["text"] = entry["text"]
+            _dirty.add(pos)
+            continue
+
+        if entry["op"] != "delete":
+            continue
+        for record_id in entry["ids"]:
+            pos = _id_to_pos.get(record_id)
+            if pos is None or metadata_store[pos]["deleted"]:
+                continue
+            metadata_store[pos]["deleted"] = True
+            metadata_store[pos]["text"] = ""
+            _dirty.add(pos)
+            _deleted += 1
+            if _type_indexes is not None:
+                sub = _type_indexes.get(metadata_store[pos]["metadata"].get("type"))
+                if sub is not None:
+                    sub.remove_ids(np.array([pos], dtype="int64"))
+
+def _replay_wal():
+    global _wal_records, _wal_offset
+
+    if not os.path.exists(FAISS_WAL_PATH):
+        return
+
+    good_offset = _wal_offset
+    entries, vectors = [], []
+    with open(FAISS_WAL_PATH, "rb") as f:
+        f.seek(_wal_offset)
+        for line in f:
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("torn write")
+                entry = json.loads(line)
+            except ValueError:
+                # Torn tail from a crash mid-append: drop it and stop
+                break
+            entries.append(entry)
+            if entry["op"] == "add":
+                vectors.append(_decode_vector(entry["vector"]))
+            good_offset += len(line)
+
+    if entries:
+        _apply(entries, np.vstack(vectors) if vectors else None)
+        _wal_records += len(entries)
+    _wal_offset = good_offset
+
+def _repair_wal():
+    # Only called under the write lock, right after catching up: anything
+    # past _wal_offset is a torn append from a writer that crashed.
+    if os.path.exists(FAISS_WAL_PATH) and os.path.getsize(FAISS_WAL_PATH) > _wal_offset:
+        with open(FAISS_WAL_PATH, "r+b") as f:
+            f.truncate(_wal_offset)
+
+def _append_wal(entries):
+    global _wal_offset
+
+    lines = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries).encode("utf-8")
+    with open(FAISS_WAL_PATH, "ab") as f:
+        f.write(lines)
+        f.flush()
+        os.fsync(f.fileno())
+    _wal_offset += len(lines)
 
 # ---------------------------
-# Load / Init metadata
+# Per-type sub-indexes
 # ---------------------------
-if os.path.exists(FAISS_META_PATH):
-    with open(FAISS_META_PATH, "r", encoding="utf-8") as f:
-        metadata_store = json.load(f)
-else:
-    metadata_store = []
+def _type_index_add(type_name, pos, vector):
+    sub = _type_indexes.get(type_name)
+    if sub is None:
+        sub = faiss.IndexIDMap(faiss.IndexFlatIP(vector.shape[1]))
+        _type_indexes[type_name] = sub
+    sub.add_with_ids(vector, np.array([pos], dtype="int64"))
+
+def _build_type_indexes():
+    global _type_indexes
+
+    vectors = faiss_index.reconstruct_all(index)
+    rows = {}
+    for pos, record in enumerate(metadata_store):
+        if not record["deleted"]:
+            rows.setdefault(record["metadata"].get("type"), []).append(pos)
+
+    # Quantized storage applies to the sub-indexes too, otherwise writers
+    # would still hold a float32 copy of every vector
+    kind = FAISS_INDEX_TYPE if FAISS_INDEX_TYPE in faiss_index.QUANTIZED_KINDS else "flat_ip"
+
+    _type_indexes = {}
+    for type_name, positions in rows.items():
+        sub = faiss.IndexIDMap(faiss_index.build_index(index.d, vectors[positions], kind, add=False))
+        sub.add_with_ids(vectors[positions], np.array(positions, dtype="int64"))
+        _type_indexes[type_name] = sub
+
+def _find_duplicate(vector, type_name):
+    if index is None:
+        return None
+    if _type_indexes is None:
+        _build_type_indexes()
+    sub = _type_indexes.get(type_name)
+    if sub is None or sub.ntotal == 0:
+        return None
+
+    scores, idxs = sub.search(vector, 1)
+    if idxs[0][0] >= 0 and scores[0][0] >= DEDUP_THRESHOLD:
+        return int(idxs[0][0])
+    return None
+
+def _merged(old_text, old_metadata, text, metadata):
+    seen_count = old_metadata.get("seen_count", 1) + 1
+
+    if DEDUP_POLICY == "replace":
+        # The stored vector is kept: it is within DEDUP_THRESHOLD of the new one
+        return text, {**metadata, "seen_count": seen_count}
+    return old_text, {**old_metadata, "seen_count": seen_count}
+
+def _matches(metadata, where):
+    for key, value in where.items():
+        if isinstance(value, (list, tuple, set)):
+            if metadata.get(key) not in value:
+                return False
+        elif metadata.get(key) != value:
+            return False
+    return True
+
+def _rows_of_types(types):
+    global _type_rows
+    if _type_rows is None:
+        _type_rows = {}
+        for pos, record in enumerate(metadata_store):
+            if not record["deleted"]:
+                _type_rows.setdefault(record["metadata"].get("type"), []).append(pos)
+    return sorted(pos for t in types for pos in _type_rows.get(t, []))
+
+def _search_index(idx, q_emb, fetch, similarity, offset=0, params=None):
+    scores, idxs = idx.search(q_emb, min(fetch, idx.ntotal), params=params)
+    if similarity:
+        scores = faiss_index.to_similarity(idx, scores)
+    return [
+        (float(score), int(i) + offset)
+        for score, i in zip(scores[0], idxs[0])
+        if i >= 0
+        and int(i) + offset < len(metadata_store)
+        and not metadata_store[int(i) + offset]["deleted"]
+    ]
+
+def _search_sources(k, types):
+    # (index, initial fetch, rows it can return, to_similarity, row offset, params)
+    base = index.ntotal if index is not None else 0
+    parts = [(idx, offset) for idx, offset in ((index, 0), (_delta, base)) if idx is not None and idx.ntotal]
+
+    if types is None:
+        # Tombstones still occupy rows in the main index
+        return [(idx, k + _deleted, idx.ntotal, True, offset, None) for idx, offset in parts]
+
+    if not VECTOR_STORE_READONLY:
+        if _type_indexes is None:
+            _build_type_indexes()
+        return [
+            (_type_indexes[t], k, _type_indexes[t].ntotal, False, 0, None)
+            for t in types
+            if t in _type_indexes and _type_indexes[t].ntotal
+        ]
+
+    # Read-only: restrict the shared index to the rows of these types
+    rows = _rows_of_types(types)
+    sources = []
+    for idx, offset in parts:
+        local = [pos - offset for pos in rows if offset <= pos < offset + idx.ntotal]
+        if not local:
+            continue
+        params = faiss_index.search_params(idx, local)
+        if params is None:
+            # No selector support: over-fetch, search() filters on type
+            sources.append((idx, k, idx.ntotal, True, offset, None))
+        else:
+            sources.append((idx, k, len(local), True, offset, params))
+    return sources
 
 # ---------------------------
 # Internal helpers
 # ---------------------------
+def _atomic_write(path, write):
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _texts(positions):
+    # In-memory texts for unflushed rows, SQLite for the rest
+    texts = {p: metadata_store[p]["text"] for p in positions if "text" in metadata_store[p]}
+    texts.update(_meta.texts(p for p in positions if p not in texts))
+    return texts
+
 def _save():
-    faiss.write_index(index, FAISS_INDEX_PATH)
-    with open(FAISS_META_PATH, "w", encoding="utf-8") as f:
-        json.dump(metadata_store, f, indent=2)
+    # Index first, then metadata, then the log: see replay notes above.
+    _atomic_write(FAISS_INDEX_PATH, lambda path: faiss.write_index(index, path))
+    # The index on disk now matches the metadata rows
+    _meta.clear_reclaim()
 
-def _embed(texts):
-    return embedder.encode(
-        texts,
-        normalize_embeddings=True
-    ).astype("float32")
+    # Only rows changed since the last compaction are written
+    dirty = sorted(_dirty)
+    _meta.write((pos, metadata_store[pos]) for pos in dirty)
+    for pos in dirty:
+        metadata_store[pos].pop("text", None)
+    _dirty.clear()
+
+def _embed(texts, batch_size=EMBED_BATCH_SIZE):
+    return embed(texts, batch_size=batch_size)
 
 # ---------------------------
 # Public API
 # ---------------------------
-def store(text: str, metadata: dict):
-    emb = _embed([text])
-    index.add(emb)
+def compact():
+    with _writing():
+        _compact()
+
+def _compact():
+    global index, _wal_records, _wal_offset, _snapshot_sig
 
-    metadata_store.append({
-        "id": str(uuid.uuid4()),
-        "text": text,
-        "metadata": metadata
-    })
+    if index is None:
+        return
 
+    # e.g. IVF mode crossing IVF_TRAIN_THRESHOLD: train and rebuild now
+    if faiss_index.needs_rebuild(index):
+        index = faiss_index.rebuild(index)
+
+    _save()
+    if os.path.exists(FAISS_WAL_PATH):
+        os.truncate(FAISS_WAL_PATH, 0)
+    _wal_records = 0
+    _wal_offset = 0
+    _reclaim()
+    _snapshot_sig = _stat_sig(FAISS_INDEX_PATH)
+
+def _reclaim():
+    # Remove tombstoned rows for good, so deletes stop costing index space
+    # and search over-fetch. Runs on a fresh snapshot (empty log, nothing
+    # dirty): the metadata is renumbered first and remembers what it
+    # dropped until the rewritten index is in place.
+    global index, metadata_store, _type_indexes, _type_rows
+
+    removed = [pos for pos, record in enumerate(metadata_store) if record["deleted"]]
+    if not removed:
+        return
+
+    _meta.reclaim(removed, index.ntotal)
+    index = faiss_index.remove_rows(index, removed)
+    metadata_store = [record for record in metadata_store if not record["deleted"]]
+    _reindex()
+    _type_indexes = None
+    _type_rows = None
     _save()
 
-def search(query: str, k: int = 5):
-    if index.ntotal == 0:
+def store_many(texts, metadatas, batch_size: int = EMBED_BATCH_SIZE):
+    texts = list(texts)
+    metadatas = list(metadatas)
+    if len(texts) != len(metadatas):
+        raise ValueError("store_many() needs one metadata dict per text")
+    if not texts:
         return []
 
-    q_emb = _embed([query])
-    _, idxs = index.search(q_emb, k)
+    # One batched encode, one log append, one index.add(). Embedding happens
+    # before taking the write lock so other writers are not held up by it.
+    _check_writable()
+    embs = _embed(texts, batch_size=batch_size)
 
-    return [
-        metadata_store[i]["text"]
-        for i in idxs[0]
-        if i < len(metadata_store)
-    ]
+    with _writing():
+        return _store_embedded(texts, metadatas, embs)
+
+def _store_embedded(texts, metadatas, embs):
+    global _wal_records
+
+    if _indexed_rows() != len(metadata_store):
+        # Positions below would point at the wrong vectors (see _reconcile)
+        raise RuntimeError(
+            f"vector store out of sync: {_indexed_rows()} index rows, "
+            f"{len(metadata_store)} records"
+        )
+
+    start = len(metadata_store)
+    adds, add_rows, updates, ids = [], [], {}, []
+
+    for i, (text, metadata) in enumerate(zip(texts, metadatas)):
+        emb = embs[i:i + 1]
+        type_name = metadata.get("type")
+
+        if DEDUP_POLICY != "off" and type_name in DEDUP_TYPES:
+            # A near-duplicate earlier in this batch, then one already stored
+            twin = next(
+                (
+                    entry for entry, row in zip(adds, add_rows)
+                    if entry["metadata"].get("type") == type_name
+                    and float(embs[row] @ emb[0]) >= DEDUP_THRESHOLD
+                ),
+                None
+            )
+            if twin is not None:
+                twin["text"], twin["metadata"] = _merged(
+                    twin["text"], twin["metadata"], text, metadata
+                )
+                ids.append(twin["id"])
+                continue
+
+            pos = _find_duplicate(emb, type_name)
+            if pos is not None:
+                record = updates.get(pos) or {
+                    "op": "update",
+                    "id": metadata_store[pos]["id"],
+                    "text": None,  # only needed, and set, by the "replace" policy
+                    "metadata": metadata_store[pos]["metadata"]
+                }
+                record["text"], record["metadata"] = _merged(
+                    record["text"], record["metadata"], text, metadata
+                )
+                updates[pos] = record
+                ids.append(record["id"])
+                continue
+
+        entry = {
+            "op": "add",
+            "pos": start + len(adds),
+            "id": str(uuid.uuid4()),
+            "text": text,
+            "metadata": metadata,
+            "vector": _encode_vector(emb)
+        }
+        adds.append(entry)
+        add_rows.append(i)
+        ids.append(entry["id"])
+
+    if DEDUP_POLICY != "replace":
+        # Merges only bump the counter; keep the log free of repeated texts
+        for update in updates.values():
+            update.pop("text")
+
+    entries = adds + list(updates.values())
+    _append_wal(entries)
+    _apply(entries, embs[add_rows] if adds else None)
+    _wal_records += len(entries)
+
+    if WAL_COMPACT_EVERY and _wal_records >= WAL_COMPACT_EVERY:
+        _compact()
+
+    return ids
+
+def store(text: str, metadata: dict):
+    return store_many([text], [metadata])[0]
+
+def delete(ids):
+    global _wal_records
+
+    with _writing():
+        ids = [i for i in ids if i in _id_to_pos]
+        if not ids:
+            return
+
+        entry = {"op": "delete", "ids": ids}
+        _append_wal([entry])
+        _apply([entry], None)
+        _wal_records += 1
+
+def list_records(where: dict = None):
+    where = where or {}
+
+    # Ids and metadata only; texts are not loaded
+    with _state_lock:
+        _refresh()
+        return [
+            {"id": r["id"], "metadata": r["metadata"]}
+            for r in metadata_store
+            if not r["deleted"] and _matches(r["metadata"], where)
+        ]
+
+def _vectors(positions):
+    base = index.ntotal if index is not None else 0
+    return np.vstack([
+        index.reconstruct(pos) if pos < base else _delta.reconstruct(pos - base)
+        for pos in positions
+    ])
+
+def search(query: str, k: int = 5, where: dict = None, with_vectors: bool = False):
+    """
+    Top-k live records for query, best first, as dicts with
+    "id", "text", "metadata" and "score" (cosine similarity).
+    with_vectors adds each record's stored embedding as "vector".
+
+    where filters on metadata: {"type": "correction"} or
+    {"type": ["correction", "validated_generation"], "source": "human"}.
+    A "type" filter searches only that type's sub-index; any other keys
+    are applied to the candidates, over-fetching until k are found.
+    """
+    q_emb = embed_query(query)
+    where = dict(where or {})
+    types = where.get("type")
+    if types is not None and not isinstance(types, (list, tuple, set)):
+        types = [types]
+
+    with _state_lock:
+        # Picks up records written by other agent processes
+        _refresh()
+        if _indexed_rows() == 0:
+            return []
+
+        hits = []
+        for idx, fetch, limit, similarity, offset, params in _search_sources(k, types):
+            while True:
+                found = [
+                    (score, pos)
+                    for score, pos in _search_index(idx, q_emb, fetch, similarity, offset, params)
+                    if _matches(metadata_store[pos]["metadata"], where)
+                ]
+                if len(found) >= k or fetch >= limit:
+                    break
+                fetch *= 2
+            hits.extend(found[:k])
+
+        hits = sorted(hits, key=lambda hit: hit[0], reverse=True)[:k]
+        texts = _texts([pos for _, pos in hits])
+
+        results = [
+            {
+                "id": metadata_store[pos]["id"],
+                "text": texts.get(pos, ""),
+                "metadata": metadata_store[pos]["metadata"],
+                "score": score
+            }
+            for score, pos in hits
+        ]
+        if with_vectors and hits:
+            for result, vector in zip(results, _vectors([pos for _, pos in hits])):
+                result["vector"] = vector
+        return results
+
+def memory_report():
+    """
+    Kind, vector count and data size in bytes of the main index, the
+    per-type sub-indexes and the replay delta, next to what the same
+    vectors take as float32. "mapped" parts live in the shared page cache
+    (read-only mode), not in this process's private memory.
+    """
+    with _state_lock:
+        _refresh()
+        if not VECTOR_STORE_READONLY and index is not None and _type_indexes is None:
+            _build_type_indexes()
+
+        parts = {}
+        if index is not None:
+            parts["index"] = index
+        if _delta is not None:
+            parts["delta"] = _delta
+        for type_name, sub in (_type_indexes or {}).items():
+            parts[f"type:{type_name}"] = sub
+
+        report = {}
+        for name, idx in parts.items():
+            size = faiss_index.footprint(idx)
+            # IndexIDMap.index is a plain faiss.Index proxy
+            inner = faiss.downcast_index(idx.index) if isinstance(idx, faiss.IndexIDMap) else idx
+            report[name] = {
+                "kind": faiss_index.index_kind(inner),
+                "vectors": idx.ntotal,
+                "bytes": size,
+                "float32_bytes": idx.ntotal * idx.d * 4,
+                "bytes_per_vector": round(size / idx.ntotal, 1) if idx.ntotal else 0.0,
+                "mapped": VECTOR_STORE_READONLY and name == "index"
+            }
+        sizes = list(report.values())
+        report["total_bytes"] = sum(r["bytes"] for r in sizes)
+        report["private_bytes"] = sum(r["bytes"] for r in sizes if not r["mapped"])
+        return report
+
+if __name__ == "__main__":
+    # python -m memory.vector_store          compact (and convert) the index
+    # python -m memory.vector_store report   memory footprint per index
+    # Compaction replays the log, migrates the index to FAISS_INDEX_TYPE
+    # (e.g. flat -> sq8 / pq) and writes a fresh snapshot.
+    import sys
+    if sys.argv[1:] == ["report"]:
+        print(json.dumps(memory_report(), indent=2))
+        sys.exit()
+
+    compact()
+    print(f"Compacted {index.ntotal if index is not None else 0} vectors "
+          f"({faiss_index.index_kind(index) if index is not None else 'empty'}).")
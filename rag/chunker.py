@@ -0,0 +1,52 @@
+# rag/chunker.py
+import ast
+import hashlib
+
+# ---------------------------
+# AST chunking of CAFY modules
+# ---------------------------
+# One chunk per top-level function and per class method (IXIA, Cafy, ...).
+# Classes without methods (the exception types) become a single chunk.
+def _signature(node):
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+def _start_lineno(node):
+    return min([node.lineno] + [d.lineno for d in node.decorator_list])
+
+def _chunk(path, lines, node, qualname, kind):
+    start = _start_lineno(node)
+    source = "\n".join(lines[start - 1:node.end_lineno])
+    return {
+        "file": path,
+        "qualname": qualname,
+        "kind": kind,
+        "signature": _signature(node) if kind != "class" else f"class {node.name}",
+        "docstring": ast.get_docstring(node) or "",
+        "lineno": node.lineno,
+        "start_lineno": start,
+        "end_lineno": node.end_lineno,
+        "source": source,
+        "hash": hashlib.sha256(f"{qualname}\n{source}".encode("utf-8")).hexdigest()
+    }
+
+def chunk_source(path: str, source: str):
+    tree = ast.parse(source)
+    lines = source.splitlines()
+    functions = (ast.FunctionDef, ast.AsyncFunctionDef)
+    chunks = []
+
+    for node in tree.body:
+        if isinstance(node, functions):
+            chunks.append(_chunk(path, lines, node, node.name, "function"))
+
+        elif isinstance(node, ast.ClassDef):
+            methods = [n for n in node.body if isinstance(n, functions)]
+            if not methods:
+                chunks.append(_chunk(path, lines, node, node.name, "class"))
+            for method in methods:
+                qualname = f"{node.name}.{method.name}"
+                chunks.append(_chunk(path, lines, method, qualname, "method"))
+
+    return chunks
@@ -1,6 +1,6 @@
-import inspect
 import os
-from memory.vector_store import store
+from memory.vector_store import store_many, delete, list_records
+from rag.chunker import chunk_source
 
 BASE_DIR = os.path.dirname(__file__)
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, ".."))
@@ -10,22 +10,57 @@ CAFY_FILES = [
     "cafy_apis/ixia_multicast.py",
 ]
 
-def ingest_file(path):
+def read_file(path):
     full_path = os.path.join(PROJECT_ROOT, path)
 
     with open(full_path, "r", encoding="utf-8") as f:
-        source = f.read()
-
-    store(
-        text=source,
-        metadata={
-            "type": "cafy_source",
-            "file": path
-        }
+        return f.read()
+
+def _chunk_text(chunk):
+    # Header first: MiniLM truncates long inputs, so the qualified name,
+    # signature and docstring are what actually gets embedded.
+    return f"# {chunk['file']} :: {chunk['qualname']}\n{chunk['source']}"
+
+def ingest_file(path):
+    chunks = {c["hash"]: c for c in chunk_source(path, read_file(path))}
+
+    existing = list_records({"type": "cafy_source", "file": path})
+    existing_hashes = {r["metadata"].get("hash") for r in existing}
+
+    # Only changed or new methods are re-embedded. Records with no hash are
+    # whole-file records from before method-level chunking.
+    new_chunks = [c for h, c in chunks.items() if h not in existing_hashes]
+    stale_ids = [r["id"] for r in existing if r["metadata"].get("hash") not in chunks]
+
+    store_many(
+        texts=[_chunk_text(c) for c in new_chunks],
+        metadatas=[
+            {
+                "type": "cafy_source",
+                "file": path,
+                "qualname": c["qualname"],
+                "kind": c["kind"],
+                "signature": c["signature"],
+                "docstring": c["docstring"],
+                "hash": c["hash"]
+            }
+            for c in new_chunks
+        ]
     )
+    delete(stale_ids)
+
+    return {
+        "added": len(new_chunks),
+        "removed": len(stale_ids),
+        "unchanged": len(chunks) - len(new_chunks)
+    }
 
 if __name__ == "__main__":
     for file in CAFY_FILES:
-        ingest_file(file)
+        summary = ingest_file(file)
+        print(
+            f"{file}: {summary['added']} added, "
+            f"{summary['removed']} removed, {summary['unchanged']} unchanged"
+        )
 
     print("CAFy API source files ingested successfully.")
@@ -1,4 +1,9 @@
+import argparse
+import json
+import os
+
 from agent_core.agent import CAFTA_Agent
+from agent_core.batch import run_batch
 
 prompt = """
 
@@ -8,8 +13,101 @@ include ipv6, and ipv6loopback with proper conditioning
 
 following ixia_multicast.py patterns.
 """
-agent = CAFTA_Agent()
-result = agent.run_cycle(prompt)
 
-print("\n--- AGENT WILL GIVE THE OUTPUT API IN SOMETIME ---\n")
-print(result)
+# ---------------------------
+# Batch mode
+# ---------------------------
+# python run_agent.py --batch intents.jsonl [--out results.jsonl] [--workers 4]
+#
+# Each input line is a JSON object with "prompt" (or "body"/"title") and an
+# optional "request_id". One result line per input line is appended to the
+# output as soon as it completes, so a rerun after a crash skips every line
+# that already finished and resumes with the rest. Lines that ended in an
+# error (timeout, API failure) are retried; their new result is appended.
+_FINISHED = {"success", "not_converged"}
+
+def _completed_lines(out_path):
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if record["status"] in _FINISHED:
+                    done.add(record["line"])
+            except (ValueError, KeyError, TypeError):
+                # Torn last line from a crash (or not a result object):
+                # that request is rerun
+                continue
+    return done
+
+def _drop_torn_tail(out_path):
+    # A crash mid-write leaves a last line without "\n"; appending to it
+    # would glue the next result onto the fragment and make it unreadable
+    if not os.path.exists(out_path):
+        return
+    with open(out_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+def _intent_text(record):
+    return record.get("prompt") or record.get("body") or record.get("title") or ""
+
+def run_jsonl(in_path, out_path, workers):
+    _drop_torn_tail(out_path)
+    done = _completed_lines(out_path)
+    pending = []  # position in this run -> (input line number, request_id)
+
+    def intents():
+        with open(in_path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if line_no in done or not line.strip():
+                    continue
+                record = json.loads(line)
+                pending.append((line_no, record.get("request_id") or record.get("id")))
+                yield _intent_text(record)
+
+    out = open(out_path, "a", encoding="utf-8")
+
+    def on_result(result):
+        line_no, request_id = pending[result["position"]]
+        out.write(json.dumps({
+            "line": line_no,
+            "request_id": request_id,
+            "status": result["status"],
+            "symbols": result.get("symbols", []),
+            "iterations": result.get("iterations", 0),
+            "prompt_tokens": result.get("prompt_tokens", 0),
+            "completion_tokens": result.get("completion_tokens", 0),
+            "latency_s": result["latency_s"],
+            "result": result["result"]
+        }) + "\n")
+        out.flush()
+        os.fsync(out.fileno())
+
+    try:
+        records = run_batch(intents(), concurrency=workers, on_result=on_result)
+    finally:
+        out.close()
+
+    ok = sum(1 for r in records if r["status"] == "success")
+    print(f"{len(records)} processed ({ok} success), {len(done)} already done -> {out_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", help="JSONL file of intents")
+    parser.add_argument("--out", help="results JSONL (default: <batch>.results.jsonl)")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.batch:
+        out_path = args.out or os.path.splitext(args.batch)[0] + ".results.jsonl"
+        run_jsonl(args.batch, out_path, args.workers)
+    else:
+        agent = CAFTA_Agent()
+        result = agent.run_cycle(prompt)
+
+        print("\n--- AGENT WILL GIVE THE OUTPUT API IN SOMETIME ---\n")
+        print(result)